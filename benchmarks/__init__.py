@@ -0,0 +1 @@
+"""Benchmarks del proceso de actualización (no son tests: se corren a mano, ver benchmarks/correr.py)."""
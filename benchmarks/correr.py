@@ -0,0 +1,234 @@
+"""Mide una corrida completa del proceso de actualización, etapa por etapa.
+
+    python -m benchmarks.correr                      # libros de 1, 5 y 20 años
+    python -m benchmarks.correr --anios 5 --repeticiones 5 --salida b.json
+    python -m benchmarks.correr --comparar benchmarks/resultados.json
+    python -m benchmarks.correr --sin-almacen --lector calamine
+
+Cada repetición parte de una copia del libro sintético (ver benchmarks/libros.py) y
+todas las fuentes responden desde el servidor local (ver benchmarks/servidor.py), así
+que no se usa la red. Se informa la mediana de tiempo de cada etapa y, en una pasada
+aparte con tracemalloc (que hace todo más lento), el pico de memoria trazada durante cada una.
+"red" y "parseo" suman el tiempo de todos los hilos de descarga, así que pueden superar
+a "descarga", que es el tiempo real de esa etapa.
+"""
+import argparse
+import json
+import logging
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+from benchmarks.libros import crear_libro, inicio_historia
+from benchmarks.servidor import ServidorLocal
+from cotizaciones import config, fuentes, lectores, libro, proceso
+from cotizaciones.almacen import Almacen
+from cotizaciones.reporte import Reporte, ReporteLog, usar
+
+SALIDA_POR_DEFECTO = Path(__file__).with_name("resultados.json")
+
+# Etapa -> (objeto, atributo) de la función que se mide
+ETAPAS = {
+    "planificar": (proceso, "_planificar_descargas"),
+    "descarga": (proceso, "descargar_fuentes"),
+    "leer": (lectores, "leer_hojas"),
+    "abrir": (libro.SesionLibro, "_cargar"),
+    "combinar": (proceso, "actualizar_hoja_excel"),
+    "estilo": (proceso, "guardar_rosario_con_estilo"),
+    "relleno": (proceso, "post_process_and_fill_sheet"),
+    "exportar": (proceso, "exportar_hojas_atrasadas"),
+    "guardar": (libro.SesionLibro, "guardar"),
+}
+
+
+class Medicion:
+    """Acumula tiempo y pico de memoria por etapa reemplazando temporalmente cada función."""
+
+    def __init__(self, memoria: bool):
+        self.memoria = memoria
+        self.segundos = {}
+        self.picos = {}
+        self.tareas = 0.0
+
+    def _envolver(self, etapa: str, funcion):
+        def medida(*args, **kwargs):
+            if self.memoria:
+                tracemalloc.reset_peak()
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                self.segundos[etapa] = self.segundos.get(etapa, 0.0) + time.perf_counter() - inicio
+                if self.memoria:
+                    self.picos[etapa] = max(self.picos.get(etapa, 0), tracemalloc.get_traced_memory()[1])
+        return medida
+
+    def _envolver_descarga(self, funcion):
+        # Tiempo de cada descarga dentro de los hilos (red + parseo), para separar el parseo
+        def descarga(tareas, *args, **kwargs):
+            def cronometrada(tarea):
+                def ejecutar():
+                    inicio = time.perf_counter()
+                    try:
+                        return tarea()
+                    finally:
+                        self.tareas += time.perf_counter() - inicio
+                return ejecutar
+            return funcion({nombre: cronometrada(t) for nombre, t in tareas.items()}, *args, **kwargs)
+        return self._envolver("descarga", descarga)
+
+    @contextmanager
+    def instalada(self):
+        originales = {etapa: getattr(obj, attr) for etapa, (obj, attr) in ETAPAS.items()}
+        try:
+            for etapa, (obj, attr) in ETAPAS.items():
+                original = originales[etapa]
+                setattr(obj, attr, self._envolver_descarga(original) if etapa == "descarga" else self._envolver(etapa, original))
+            yield self
+        finally:
+            for etapa, (obj, attr) in ETAPAS.items():
+                setattr(obj, attr, originales[etapa])
+
+
+def _preparar_copia(plantilla: Path, destino: Path, con_almacen: bool):
+    shutil.rmtree(destino, ignore_errors=True)
+    shutil.copytree(plantilla, destino)
+    if not con_almacen:
+        excel = destino / "libro.xlsx"
+        shutil.rmtree(Almacen(excel).directorio, ignore_errors=True)
+
+def correr_una_vez(directorio: Path, servidor: ServidorLocal, memoria: bool, lector: str) -> dict:
+    """Ejecuta el proceso completo sobre directorio/libro.xlsx y devuelve segundos (o bytes) por etapa."""
+    excel = directorio / "libro.xlsx"
+    config.CONFIG_FILE = str(directorio / "config.json")
+    config.guardar_config({'excel_path': str(excel), 'lector_excel': lector})
+    fuentes._cache_viewstate.update(campos=None)
+    servidor.adaptador.segundos = 0.0
+
+    medicion = Medicion(memoria)
+    if memoria:
+        tracemalloc.start()
+    try:
+        inicio = time.perf_counter()
+        with medicion.instalada():
+            exito = proceso.ejecutar_proceso_completo_de_actualizacion()
+        total = time.perf_counter() - inicio
+        pico_total = tracemalloc.get_traced_memory()[1] if memoria else 0
+    finally:
+        if memoria:
+            tracemalloc.stop()
+    if not exito:
+        raise RuntimeError(f"La corrida sobre {excel} no terminó bien (ver el log con -v)")
+
+    if memoria:
+        return {**medicion.picos, "total": pico_total}
+    red = servidor.adaptador.segundos
+    return {**medicion.segundos, "red": red, "parseo": max(0.0, medicion.tareas - red), "total": total}
+
+def medir_escenario(anios: int, con_almacen: bool, repeticiones: int, memoria: bool, trabajo: Path, servidor: ServidorLocal, lector: str) -> dict:
+    plantilla = trabajo / f"plantilla_{anios}"
+    if not plantilla.exists():
+        plantilla.mkdir(parents=True)
+        crear_libro(plantilla / "libro.xlsx", anios)
+    copia = trabajo / "corrida"
+    servidor.usar_inicio(inicio_historia(anios))
+
+    tiempos = []
+    for _ in range(repeticiones):
+        _preparar_copia(plantilla, copia, con_almacen)
+        tiempos.append(correr_una_vez(copia, servidor, memoria=False, lector=lector))
+    resultado = {
+        "anios": anios,
+        "almacen": con_almacen,
+        "excel_mb": round((plantilla / "libro.xlsx").stat().st_size / 1e6, 2),
+        "repeticiones": tiempos,
+        "mediana_s": {etapa: round(statistics.median(t.get(etapa, 0.0) for t in tiempos), 4) for etapa in tiempos[0]},
+    }
+    if memoria:
+        _preparar_copia(plantilla, copia, con_almacen)
+        picos = correr_una_vez(copia, servidor, memoria=True, lector=lector)
+        resultado["pico_mb"] = {etapa: round(b / 1e6, 1) for etapa, b in picos.items()}
+    return resultado
+
+def _clave(escenario: dict) -> tuple:
+    return escenario["anios"], escenario["almacen"]
+
+def comparar(actual: dict, anterior: dict):
+    """Imprime la variación de la mediana de cada etapa respecto de una corrida anterior."""
+    previos = {_clave(e): e for e in anterior.get("escenarios", [])}
+    for escenario in actual["escenarios"]:
+        previo = previos.get(_clave(escenario))
+        if previo is None:
+            continue
+        print(f"\n{escenario['anios']} años, almacén={escenario['almacen']}")
+        for etapa, segundos in escenario["mediana_s"].items():
+            antes = previo["mediana_s"].get(etapa)
+            if antes:
+                print(f"  {etapa:<11} {antes:8.3f}s -> {segundos:8.3f}s  ({(segundos - antes) / antes:+.0%})")
+
+def imprimir(escenario: dict):
+    print(f"\n{escenario['anios']} años, almacén={escenario['almacen']} ({escenario['excel_mb']} MB)")
+    picos = escenario.get("pico_mb", {})
+    for etapa, segundos in escenario["mediana_s"].items():
+        memoria = f"  {picos[etapa]:7.1f} MB" if etapa in picos else ""
+        print(f"  {etapa:<11} {segundos:8.3f}s{memoria}")
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.correr", description="Benchmark del proceso de actualización.")
+    parser.add_argument("--anios", type=int, nargs="+", default=[1, 5, 20], help="Años de historia de los libros sintéticos.")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-almacen", action="store_true", help="Mide también la primera corrida sin almacén local (se lee el Excel).")
+    parser.add_argument("--sin-memoria", action="store_true", help="No hace la pasada con tracemalloc.")
+    parser.add_argument("--lector", choices=sorted(lectores.MOTORES), default=lectores.MOTOR_POR_DEFECTO, help="Lector de Excel para las hojas sin almacén (ver cotizaciones/lectores.py).")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Demora artificial por respuesta del servidor local, en segundos.")
+    parser.add_argument("--salida", type=Path, default=SALIDA_POR_DEFECTO, help="Archivo JSON de resultados.")
+    parser.add_argument("--comparar", type=Path, help="Resultados anteriores contra los que comparar.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Muestra los mensajes del proceso.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    usar(ReporteLog() if args.verbose else Reporte())
+    anterior = json.loads(args.comparar.read_text(encoding='utf-8')) if args.comparar else None
+
+    escenarios = [(anios, True) for anios in args.anios]
+    if args.sin_almacen:
+        escenarios += [(anios, False) for anios in args.anios]
+
+    config_original = config.CONFIG_FILE
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "openpyxl": openpyxl.__version__,
+        "lector": args.lector,
+        "escenarios": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="bench_cotizaciones_") as tmp, ServidorLocal(args.latencia) as servidor:
+        if servidor.grabadas:
+            print(f"Respuestas grabadas: {', '.join(servidor.grabadas)}")
+        try:
+            for anios, con_almacen in escenarios:
+                escenario = medir_escenario(anios, con_almacen, args.repeticiones, not args.sin_memoria, Path(tmp), servidor, args.lector)
+                imprimir(escenario)
+                resultados["escenarios"].append(escenario)
+        finally:
+            config.CONFIG_FILE = config_original
+
+    args.salida.write_text(json.dumps(resultados, indent=2), encoding='utf-8')
+    print(f"\nResultados guardados en {args.salida}")
+    if anterior:
+        comparar(resultados, anterior)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
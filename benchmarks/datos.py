@@ -0,0 +1,56 @@
+"""Valores sintéticos de cada fuente, deterministas por fecha.
+
+El libro sintético y el servidor local usan las mismas funciones, así que para una
+misma fecha ambos tienen el mismo valor: al volver a pedir días ya guardados no hay
+diferencias, igual que con las fuentes reales.
+"""
+import numpy as np
+import pandas as pd
+
+from cotizaciones.hojas import EXCEL_COLUMNS, ROSARIO_MAP
+
+_ORIGEN = pd.Timestamp("2000-01-01")
+
+
+def valores(fechas: pd.DatetimeIndex, base: float, semilla: int) -> np.ndarray:
+    """Tendencia creciente con una oscilación propia de cada serie."""
+    k = (fechas - _ORIGEN).days.to_numpy()
+    return np.round(base * (1 + 0.0004 * k) * (1 + 0.02 * np.sin(k / 9 + semilla)), 2)
+
+def es_estimativo(fechas: pd.DatetimeIndex) -> np.ndarray:
+    """Días en los que la pizarra solo publica un valor estimativo."""
+    return (fechas - _ORIGEN).days.to_numpy() % 7 == 3
+
+def bna(dias: pd.DatetimeIndex) -> pd.DataFrame:
+    billete = valores(dias, 1000.0, 1)
+    return pd.DataFrame(dict(zip(EXCEL_COLUMNS, [dias, billete, billete + 50, billete + 20, billete + 30])))
+
+def mep(dias: pd.DatetimeIndex) -> pd.DataFrame:
+    return pd.DataFrame({'fecha': dias, 'DOLAR MEP': valores(dias, 1100.0, 2)})
+
+def libre(dias: pd.DatetimeIndex) -> pd.DataFrame:
+    compra = valores(dias, 1150.0, 3)
+    return pd.DataFrame({'Fecha': dias, 'Compra': compra, 'Venta': compra + 20})
+
+def uva(dias: pd.DatetimeIndex) -> pd.DataFrame:
+    return pd.DataFrame({'Fecha': dias, 'Valor': valores(dias, 10.0, 4)})
+
+def cac(meses: pd.DatetimeIndex) -> pd.DataFrame:
+    general = valores(meses, 100.0, 5)
+    return pd.DataFrame({
+        'Periodo': meses, 'General': general,
+        'Materiales': np.round(general * 1.1, 2), 'Mano de obra': np.round(general * 0.9, 2),
+    })
+
+def serie_mensual(meses: pd.DatetimeIndex, semilla: int) -> np.ndarray:
+    """Series de datos.gob.ar (SMVyM, IPC), según el id pedido."""
+    return valores(meses, 100.0, 6 + semilla)
+
+def pizarra(dias: pd.DatetimeIndex) -> pd.DataFrame:
+    """Pizarra Rosario con la forma del almacén local: valor y marca de estimativo por cereal."""
+    df = pd.DataFrame({'Fecha': dias})
+    estimativo = es_estimativo(dias)
+    for i, columna in enumerate(ROSARIO_MAP.values()):
+        df[columna] = valores(dias, 200000.0 + 10000 * i, 10 + i)
+        df[f"{columna}_is_est"] = estimativo
+    return df
@@ -0,0 +1,55 @@
+"""Libros Excel sintéticos con varios años de historia en las ocho hojas.
+
+El último dato de las series diarias queda unos días antes de hoy, de modo que una
+corrida del proceso tenga que descargar, combinar, rellenar y guardar como un día normal.
+"""
+from datetime import date, timedelta
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+from benchmarks import datos
+from cotizaciones.hojas import (
+    EXCEL_SHEET, MEP_SHEET, LIBRE_SHEET, UVA_SHEET, CAC_SHEET, SMVYM_SHEET, IPC_SHEET, ROSARIO_SHEET, FORMATOS_POR_HOJA,
+)
+from cotizaciones.libro import SesionLibro, asegurar_hojas_existen, guardar_rosario_con_estilo
+from cotizaciones.series import aplicar_esquema
+
+# Días sin actualizar al momento de correr el benchmark
+DIAS_DE_ATRASO = 4
+
+
+def inicio_historia(anios: int, hoy: date | None = None) -> date:
+    return (hoy or date.today()) - timedelta(days=DIAS_DE_ATRASO + 365 * anios)
+
+def series_sinteticas(anios: int, hoy: date | None = None) -> dict[str, pd.DataFrame]:
+    """Una serie por hoja con `anios` de historia, con los mismos tipos que guarda el proceso."""
+    desde = inicio_historia(anios, hoy)
+    hasta = (hoy or date.today()) - timedelta(days=DIAS_DE_ATRASO)
+    dias = pd.date_range(desde, hasta, freq='D').as_unit('ns')
+    meses = pd.date_range(desde.replace(day=1), hasta, freq='MS')
+
+    series = {
+        EXCEL_SHEET: datos.bna(dias),
+        MEP_SHEET: datos.mep(dias),
+        LIBRE_SHEET: datos.libre(dias),
+        UVA_SHEET: datos.uva(dias),
+        CAC_SHEET: datos.cac(meses),
+        SMVYM_SHEET: pd.DataFrame({'Periodo': meses, 'Salario': datos.serie_mensual(meses, 0)}),
+        IPC_SHEET: pd.DataFrame({'Fecha': meses, 'Valor': datos.serie_mensual(meses, 1)}),
+        ROSARIO_SHEET: datos.pizarra(dias),
+    }
+    return {hoja: aplicar_esquema(df, hoja) for hoja, df in series.items()}
+
+def crear_libro(path: Path, anios: int, hoy: date | None = None):
+    """Crea el Excel (y su almacén local) con `anios` de historia hasta DIAS_DE_ATRASO días antes de hoy."""
+    openpyxl.Workbook().save(path)
+    with SesionLibro(path) as libro:
+        asegurar_hojas_existen(libro)
+        for hoja, df in series_sinteticas(anios, hoy).items():
+            if hoja == ROSARIO_SHEET:
+                guardar_rosario_con_estilo(libro, df)
+            else:
+                libro.almacen.escribir(hoja, df)
+                libro.reemplazar_hoja(hoja, df, FORMATOS_POR_HOJA[hoja])
@@ -0,0 +1,279 @@
+"""Servidor local que reemplaza a todas las fuentes durante los benchmarks.
+
+Se monta un adaptador en la sesión del cliente HTTP compartido que redirige cada
+petición (Errepar, Ámbito, argentinadatos, ikiwi, datos.gob.ar y GGSA) a un servidor
+en 127.0.0.1. Si en `benchmarks/respuestas/` hay una respuesta grabada para la fuente
+(ver `grabar`), se devuelve tal cual; si no, se genera una con el mismo formato que la
+real para las fechas pedidas, así el proceso recorre exactamente el mismo código.
+"""
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+from requests.adapters import HTTPAdapter
+
+from benchmarks import datos
+from cotizaciones import fuentes
+from cotizaciones.cliente_http import cliente
+from cotizaciones.hojas import ROSARIO_MAP
+
+RESPUESTAS_DIR = Path(__file__).with_name("respuestas")
+
+# Semilla de cada serie de datos.gob.ar (ver datos.serie_mensual)
+SEMILLA_SERIE = {fuentes.SMVYM_SERIE_ID: 0, fuentes.IPC_SERIE_ID: 1}
+
+
+# --- RESPUESTAS SINTÉTICAS ---
+
+def _fecha(texto: str, formato: str = '%Y-%m-%d') -> date:
+    return pd.to_datetime(texto, format=formato).date()
+
+def _habiles(desde: date, hasta: date) -> pd.DatetimeIndex:
+    return pd.bdate_range(desde, hasta)
+
+def _coma(valor: float) -> str:
+    return f"{valor:.2f}".replace('.', ',')
+
+def _errepar_get() -> bytes:
+    campos = "".join(
+        f'<input type="hidden" name="{c}" id="{c}" value="{c.lower()}-bench" />'
+        for c in ("__VIEWSTATE", "__VIEWSTATEGENERATOR", "__EVENTVALIDATION")
+    )
+    return f"<html><body><form>{campos}</form></body></html>".encode('utf-8')
+
+def _errepar_post(cuerpo: bytes) -> bytes:
+    form = parse_qs(cuerpo.decode('utf-8'))
+    desde = _fecha(form['ctl00$ContentPlaceHolder1$inputDateDesde'][0], '%d/%m/%Y')
+    hasta = _fecha(form['ctl00$ContentPlaceHolder1$inputDateHasta'][0], '%d/%m/%Y')
+    df = datos.bna(_habiles(desde, hasta))
+    filas = "".join(
+        f"<tr><td>{fecha:%d/%m/%Y}</td>" + "".join(f"<td>{_coma(v)}</td>" for v in fila) + "</tr>"
+        for fecha, *fila in df.itertuples(index=False, name=None)
+    )
+    tabla = f'<table class="table"><tr><th>Fecha</th></tr><tr><th>Compra</th></tr>{filas}<tr><td>Fin</td></tr></table>'
+    return f"1|#||4|{len(tabla)}|updatePanel|ContentPlaceHolder1_updPnl|{tabla}|0|hiddenField|__EVENTTARGET||".encode('utf-8')
+
+def _ambito(ruta: str) -> bytes:
+    partes = ruta.rstrip('/').split('/')
+    dias = _habiles(_fecha(partes[-2]), _fecha(partes[-1]))
+    if "/mep/" in ruta:
+        df = datos.mep(dias)
+        filas = [["fecha", "DOLAR MEP"]] + [[f"{d:%d/%m/%Y}", float(v)] for d, v in df.itertuples(index=False, name=None)]
+    else:
+        df = datos.libre(dias)
+        filas = [["Fecha", "Compra", "Venta"]] + [[f"{d:%d/%m/%Y}", _coma(c), _coma(v)] for d, c, v in df.itertuples(index=False, name=None)]
+    return json.dumps(filas).encode('utf-8')
+
+def _uva(desde: date, hasta: date) -> bytes:
+    df = datos.uva(pd.date_range(desde, hasta, freq='D'))
+    return json.dumps([{"fecha": f"{d:%Y-%m-%d}", "valor": float(v)} for d, v in df.itertuples(index=False, name=None)]).encode('utf-8')
+
+def _cac(desde: date, hasta: date) -> bytes:
+    df = datos.cac(pd.date_range(desde.replace(day=1), hasta, freq='MS'))
+    return json.dumps([
+        {"period": f"{m:%Y-%m-%d}T00:00:00.000Z", "general": g, "materials": mat, "labour_force": mo}
+        for m, g, mat, mo in df.itertuples(index=False, name=None)
+    ]).encode('utf-8')
+
+def _series(consulta: dict, desde: date, hasta: date) -> bytes:
+    ids = consulta['ids'][0].split(',')
+    if 'start_date' in consulta:
+        desde = _fecha(consulta['start_date'][0])
+    meses = pd.date_range(desde.replace(day=1), hasta, freq='MS')
+    columnas = [datos.serie_mensual(meses, SEMILLA_SERIE.get(i, 2 + n)) for n, i in enumerate(ids)]
+    data = [[f"{m:%Y-%m-%d}", *(float(c[j]) for c in columnas)] for j, m in enumerate(meses)]
+    return json.dumps({"data": data, "count": len(data)}).encode('utf-8')
+
+def _ggsa(ruta: str) -> bytes:
+    partes = ruta.rstrip('/').split('/')
+    df = datos.pizarra(_habiles(_fecha(partes[-2]), _fecha(partes[-1])))
+    pizarra = {f"{d:%Y-%m-%d}": {} for d in df["Fecha"]}
+    for api_key, columna in ROSARIO_MAP.items():
+        for d, v, est in zip(df["Fecha"], df[columna], df[f"{columna}_is_est"]):
+            # Los días estimativos no tienen precio, como en la pizarra real
+            pizarra[f"{d:%Y-%m-%d}"][api_key] = {"precio": 0 if est else float(v), "estimativo": float(v) if est else 0}
+    return json.dumps({"pizarra": pizarra}).encode('utf-8')
+
+# Nombre de la fuente según host y ruta (también es el nombre del archivo grabado)
+def fuente_de(host: str, ruta: str) -> str | None:
+    if host == "portalerrepar.errepar.com":
+        return "errepar"
+    if host == "mercados.ambito.com":
+        return "ambito_mep" if "/mep/" in ruta else "ambito_libre"
+    return {
+        "api.argentinadatos.com": "uva",
+        "prestamos.ikiwi.net.ar": "cac",
+        "apis.datos.gob.ar": "datos_gob",
+        "www.ggsa.com.ar": "ggsa",
+    }.get(host)
+
+def respuesta_sintetica(metodo: str, host: str, ruta: str, consulta: dict, cuerpo: bytes, inicio: date) -> bytes | None:
+    """Respuesta con el formato de la fuente real; las que siempre devuelven la serie completa arrancan en `inicio`."""
+    hoy = date.today()
+    fuente = fuente_de(host, ruta)
+    if fuente == "errepar":
+        return _errepar_post(cuerpo) if metodo == 'POST' else _errepar_get()
+    if fuente in ("ambito_mep", "ambito_libre"):
+        return _ambito(ruta)
+    if fuente == "uva":
+        return _uva(inicio, hoy)
+    if fuente == "cac":
+        return _cac(inicio, hoy)
+    if fuente == "datos_gob":
+        return _series(consulta, inicio, hoy)
+    if fuente == "ggsa":
+        return _ggsa(ruta)
+    return None
+
+
+# --- SERVIDOR Y ADAPTADOR ---
+
+class _Manejador(BaseHTTPRequestHandler):
+    """Las rutas llegan como /<host>/<ruta original>?<consulta original>."""
+
+    def _responder(self, metodo: str):
+        partes = urlsplit(self.path)
+        _, host, ruta = partes.path.split('/', 2)
+        ruta = '/' + ruta
+        largo = int(self.headers.get('Content-Length') or 0)
+        cuerpo = self.rfile.read(largo) if largo else b""
+
+        servidor = self.server
+        fuente = fuente_de(host, ruta)
+        grabada = servidor.grabadas.get((fuente, metodo)) or servidor.grabadas.get((fuente, None))
+        contenido = grabada if grabada is not None else respuesta_sintetica(metodo, host, ruta, parse_qs(partes.query), cuerpo, servidor.inicio)
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+        if contenido is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json' if contenido[:1] in (b'{', b'[') else 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def do_GET(self):
+        self._responder('GET')
+
+    def do_POST(self):
+        self._responder('POST')
+
+    def log_message(self, *args):
+        pass
+
+
+class _AdaptadorLocal(HTTPAdapter):
+    """Reescribe https://host/ruta a http://127.0.0.1:<puerto>/host/ruta y mide el tiempo de red."""
+
+    def __init__(self, puerto: int, **kwargs):
+        super().__init__(**kwargs)
+        self.puerto = puerto
+        self.segundos = 0.0
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        partes = urlsplit(request.url)
+        request.url = f"http://127.0.0.1:{self.puerto}/{partes.hostname}{partes.path}" + (f"?{partes.query}" if partes.query else "")
+        inicio = time.perf_counter()
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            with self._lock:
+                self.segundos += time.perf_counter() - inicio
+
+
+def _cargar_grabadas() -> dict:
+    """Respuestas grabadas: <fuente>.<metodo>.body o <fuente>.body."""
+    grabadas = {}
+    if RESPUESTAS_DIR.exists():
+        for archivo in RESPUESTAS_DIR.glob("*.body"):
+            partes = archivo.name.split('.')
+            metodo = partes[1] if len(partes) == 3 else None
+            grabadas[(partes[0], metodo)] = archivo.read_bytes()
+    return grabadas
+
+
+class ServidorLocal:
+    """Context manager: levanta el servidor y desvía el cliente HTTP compartido hacia él."""
+
+    def __init__(self, latencia: float = 0.0, usar_grabadas: bool = True, inicio: date = date(2016, 1, 1)):
+        self.latencia = latencia
+        self.inicio = inicio
+        self.usar_grabadas = usar_grabadas
+        self.adaptador = None
+
+    def __enter__(self) -> "ServidorLocal":
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Manejador)
+        self.httpd.daemon_threads = True
+        self.httpd.latencia = self.latencia
+        self.httpd.inicio = self.inicio
+        self.httpd.grabadas = _cargar_grabadas() if self.usar_grabadas else {}
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        self._adaptadores = dict(cliente.session.adapters)
+        self.adaptador = _AdaptadorLocal(self.httpd.server_address[1], pool_maxsize=8, max_retries=0)
+        cliente.session.mount('https://', self.adaptador)
+        cliente.session.mount('http://', self.adaptador)
+        return self
+
+    def __exit__(self, *exc):
+        cliente.session.adapters.clear()
+        cliente.session.adapters.update(self._adaptadores)
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
+
+    def usar_inicio(self, inicio: date):
+        """Primera fecha de las fuentes que devuelven la serie completa (la del libro sintético)."""
+        self.inicio = self.httpd.inicio = inicio
+
+    @property
+    def grabadas(self) -> list[str]:
+        return sorted({fuente for fuente, _ in self.httpd.grabadas})
+
+
+# --- GRABACIÓN DE RESPUESTAS REALES ---
+
+def grabar(dias: int = 30):
+    """Descarga una vez cada fuente real (últimos `dias`) y guarda las respuestas en RESPUESTAS_DIR."""
+    RESPUESTAS_DIR.mkdir(exist_ok=True)
+    hasta = date.today() - timedelta(days=1)
+    desde = hasta - timedelta(days=dias)
+    fechas = {'desde': desde.strftime('%Y-%m-%d'), 'hasta': hasta.strftime('%Y-%m-%d')}
+    peticiones = [
+        ("ambito_mep", fuentes.AMBITO_MEP_URL_TMPL.format(**fechas)),
+        ("ambito_libre", fuentes.AMBITO_LIBRE_URL_TMPL.format(**fechas)),
+        ("uva", fuentes.UVA_URL),
+        ("cac", fuentes.CAC_URL),
+        ("datos_gob", fuentes.url_series([fuentes.SMVYM_SERIE_ID])),
+        ("ggsa", fuentes.ROSARIO_URL_TMPL.format(**fechas)),
+    ]
+    for fuente, url in peticiones:
+        r = cliente.get(url)
+        r.raise_for_status()
+        (RESPUESTAS_DIR / f"{fuente}.body").write_bytes(r.content)
+        print(f"{fuente}: {len(r.content):,} bytes")
+
+    # Errepar necesita el ViewState de la página para responder al POST
+    pagina = cliente.get(fuentes.URL, headers=fuentes.HEADERS)
+    pagina.raise_for_status()
+    (RESPUESTAS_DIR / "errepar.GET.body").write_bytes(pagina.content)
+    fuentes._cache_viewstate.update(campos=None)
+    payload = fuentes.get_dynamic_payload_fields()
+    payload['ctl00$ContentPlaceHolder1$inputDateDesde'] = desde.strftime('%d/%m/%Y')
+    payload['ctl00$ContentPlaceHolder1$inputDateHasta'] = hasta.strftime('%d/%m/%Y')
+    r = cliente.post(fuentes.URL, data=payload, headers=fuentes.POST_HEADERS)
+    r.raise_for_status()
+    (RESPUESTAS_DIR / "errepar.POST.body").write_bytes(r.content)
+    print(f"errepar: {len(pagina.content) + len(r.content):,} bytes")
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.servidor  graba las respuestas reales en benchmarks/respuestas/
+    grabar()
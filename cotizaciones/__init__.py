@@ -0,0 +1 @@
+"""Componentes compartidos del actualizador de cotizaciones."""
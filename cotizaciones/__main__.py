@@ -0,0 +1,139 @@
+"""Actualización sin interfaz: `python -m cotizaciones`.
+
+Pensado para el programador de tareas (cron / Programador de tareas de Windows) o
+para dejarlo corriendo con `--daemon`. Usa el mismo config.json que la página.
+"""
+import argparse
+import logging
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from cotizaciones import catalogo, config
+from cotizaciones.catalogo import FUENTE_POR_NOMBRE, HOJA_POR_FUENTE
+from cotizaciones.hojas import HOJAS_NECESARIAS
+from cotizaciones.proceso import (
+    BACKFILL_HILOS, TRAMO_POR_FUENTE, ejecutar_backfill, ejecutar_proceso_completo_de_actualizacion,
+)
+from cotizaciones.reporte import ReporteLog, logger, usar
+
+# Espera máxima entre chequeos en modo daemon (por si cambia el config.json)
+ESPERA_MAXIMA_DAEMON = 3600
+# Espera antes de reintentar una actualización fallida en modo daemon
+ESPERA_REINTENTO_DAEMON = 900
+
+
+def _resolver_hojas(nombres: list[str]) -> set[str]:
+    """Traduce nombres de hoja o de fuente (sin distinguir mayúsculas) a nombres de hoja."""
+    por_nombre = {hoja.lower(): hoja for hoja in HOJAS_NECESARIAS}
+    por_nombre.update({fuente.lower(): hoja for fuente, hoja in HOJA_POR_FUENTE.items()})
+    hojas = set()
+    for nombre in nombres:
+        hoja = por_nombre.get(nombre.strip().lower())
+        if hoja is None:
+            validos = ", ".join(dict.fromkeys(list(HOJA_POR_FUENTE) + HOJAS_NECESARIAS))
+            raise argparse.ArgumentTypeError(f"Hoja o fuente desconocida: '{nombre}'. Opciones: {validos}")
+        hojas.add(hoja)
+    return hojas
+
+def _fecha(texto: str) -> date:
+    try:
+        fecha = date.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Fecha inválida: '{texto}' (formato AAAA-MM-DD)")
+    if fecha >= date.today():
+        raise argparse.ArgumentTypeError(f"La fecha de inicio del backfill debe ser anterior a hoy: {texto}")
+    return fecha
+
+def _correr(funcion, *args) -> bool:
+    try:
+        return funcion(*args)
+    except Exception:
+        logger.exception("La actualización terminó con un error inesperado.")
+        return False
+
+def _modo_daemon(intervalo_horas: float | None, solo: set[str] | None):
+    """Consulta cada fuente cuando le toca según su cadencia (ver cotizaciones/catalogo.py)."""
+    if intervalo_horas is not None:
+        _daemon_por_intervalo(timedelta(hours=intervalo_horas), solo)
+        return
+    fuentes = catalogo.seleccionar(solo)
+    logger.info("Modo daemon: cada fuente se consulta según su cadencia (%s).", ", ".join(f.nombre for f in fuentes))
+    reintento = datetime.min
+    while True:
+        proxima = max(catalogo.proxima_consulta(fuentes, config.ultimas_consultas(FUENTE_POR_NOMBRE)), reintento)
+        restante = (proxima - datetime.now()).total_seconds()
+        if restante > 0:
+            time.sleep(min(restante, ESPERA_MAXIMA_DAEMON))
+            continue
+        if not _correr(ejecutar_proceso_completo_de_actualizacion, solo, True):
+            logger.warning("Se reintentará en %d minutos.", ESPERA_REINTENTO_DAEMON // 60)
+        # Si alguna fuente sigue vencida (falló su descarga), no se insiste antes de la espera
+        reintento = datetime.now() + timedelta(seconds=ESPERA_REINTENTO_DAEMON)
+
+def _daemon_por_intervalo(intervalo: timedelta, solo: set[str] | None):
+    """Actualiza todas las fuentes cada vez que vence el intervalo desde la última actualización completa."""
+    logger.info("Modo daemon: actualización cada %s.", intervalo)
+    ultima_parcial = datetime.min
+    while True:
+        # Con --only no se registra last_update, así que se lleva la cuenta en memoria
+        ultima = config.ultima_actualizacion() if solo is None else ultima_parcial
+        restante = (ultima + intervalo - datetime.now()).total_seconds()
+        if restante > 0:
+            time.sleep(min(restante, ESPERA_MAXIMA_DAEMON))
+            continue
+        if _correr(ejecutar_proceso_completo_de_actualizacion, solo):
+            ultima_parcial = datetime.now()
+        else:
+            logger.warning("Se reintentará en %d minutos.", ESPERA_REINTENTO_DAEMON // 60)
+            time.sleep(ESPERA_REINTENTO_DAEMON)
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m cotizaciones", description="Actualiza el Excel de cotizaciones sin abrir la página.")
+    parser.add_argument("--only", metavar="HOJAS", help="Hojas o fuentes a actualizar, separadas por coma (ej: BNA,MEP,Pizarra Rosario).")
+    parser.add_argument("--todas", action="store_true", help="Consulta todas las fuentes, aunque no les toque según su cadencia.")
+    parser.add_argument("--daemon", action="store_true", help="Queda corriendo y consulta cada fuente cuando le toca según su cadencia.")
+    parser.add_argument("--interval", type=float, metavar="HORAS", help="Con --daemon, ignora las cadencias y actualiza todo cada HORAS horas.")
+    parser.add_argument("--backfill", type=_fecha, metavar="DESDE", help=(
+        "Descarga la historia desde esa fecha (AAAA-MM-DD) por meses; si se interrumpe, "
+        f"la próxima ejecución retoma desde los meses que faltan. Fuentes: {', '.join(TRAMO_POR_FUENTE)}."
+    ))
+    parser.add_argument("--hilos", type=int, default=BACKFILL_HILOS, help=f"Meses que el backfill descarga a la vez (por defecto {BACKFILL_HILOS}).")
+    parser.add_argument("--config", metavar="RUTA", help=f"Archivo de configuración (por defecto {config.CONFIG_FILE}).")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Muestra también los mensajes de depuración.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    usar(ReporteLog())
+
+    if args.config:
+        config.CONFIG_FILE = args.config
+    if 'excel_path' not in config.cargar_config():
+        logger.error("No hay ruta de Excel en %s. Configurala desde la página primero.", config.CONFIG_FILE)
+        return 2
+
+    try:
+        solo = _resolver_hojas(args.only.split(",")) if args.only else None
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    if args.backfill:
+        if args.daemon:
+            parser.error("--backfill no se puede combinar con --daemon.")
+        return 0 if _correr(ejecutar_backfill, args.backfill, solo, args.hilos) else 1
+    if args.daemon:
+        try:
+            _modo_daemon(args.interval, solo)
+        except KeyboardInterrupt:
+            logger.info("Modo daemon detenido.")
+        return 0
+    # Con --only se piden esas hojas aunque no les toque; si no, solo las fuentes vencidas
+    solo_vencidas = not (args.todas or args.only)
+    return 0 if _correr(ejecutar_proceso_completo_de_actualizacion, solo, solo_vencidas) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Almacén columnar local: un archivo Arrow/Feather por serie.
+
+Es la fuente de verdad de los datos descargados. Las descargas nuevas se combinan
+acá y el Excel se genera a partir de estas series, por lo que puede regenerarse en
+cualquier momento sin consultar las APIs. Los archivos se escriben sin compresión
+para poder leerlos mapeados en memoria.
+
+Cada archivo lleva en los metadatos de su esquema un hash del contenido (ver `hash_de`):
+escribir una serie idéntica a la guardada no toca el disco y avisa que no hubo cambios.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+EXTENSION = ".feather"
+CLAVE_HASH = b"cotizaciones.hash"
+
+
+def hash_de(df: pd.DataFrame) -> str:
+    """Hash del contenido de la serie: columnas, tipos y valores fila por fila (sin el índice)."""
+    h = hashlib.sha1(json.dumps([[str(col), str(tipo)] for col, tipo in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class Almacen:
+    """Series guardadas en `<carpeta del Excel>/<nombre del Excel>_datos/<serie>.feather`."""
+
+    def __init__(self, excel_path: Path):
+        self.directorio = excel_path.with_name(f"{excel_path.stem}_datos")
+
+    def subalmacen(self, nombre: str) -> "Almacen":
+        """Almacén en una subcarpeta (ej. los tramos de un backfill), fuera de las series del Excel."""
+        sub = Almacen.__new__(Almacen)
+        sub.directorio = self.directorio / nombre
+        return sub
+
+    def ruta(self, serie: str) -> Path:
+        nombre = serie.replace('/', '_').replace('\\', '_')
+        return self.directorio / f"{nombre}{EXTENSION}"
+
+    def existe(self, serie: str) -> bool:
+        return self.ruta(serie).exists()
+
+    def series(self) -> list[str]:
+        if not self.directorio.exists():
+            return []
+        return sorted(p.stem for p in self.directorio.glob(f"*{EXTENSION}"))
+
+    def _leer_tabla(self, serie: str, columnas: list[str] | None = None) -> pa.Table | None:
+        ruta = self.ruta(serie)
+        if not ruta.exists():
+            return None
+        return feather.read_table(ruta, columns=columnas, memory_map=True)
+
+    def leer(self, serie: str, columnas: list[str] | None = None) -> pd.DataFrame | None:
+        """Devuelve la serie completa (o solo `columnas`), o None si todavía no está en el almacén."""
+        tabla = self._leer_tabla(serie, columnas)
+        return None if tabla is None else tabla.to_pandas()
+
+    def ultimas_filas(self, serie: str, n: int) -> pd.DataFrame | None:
+        tabla = self._leer_tabla(serie)
+        if tabla is None:
+            return None
+        return tabla.slice(max(0, tabla.num_rows - n)).to_pandas()
+
+    def ultima_clave(self, serie: str, columna: str):
+        """Última clave de la serie (las series se guardan ordenadas por su clave)."""
+        tabla = self._leer_tabla(serie, [columna])
+        if tabla is None or tabla.num_rows == 0:
+            return None
+        return tabla.column(0)[tabla.num_rows - 1].as_py()
+
+    def hash(self, serie: str) -> str | None:
+        """Hash guardado con la serie (None si no existe o se escribió con una versión anterior)."""
+        ruta = self.ruta(serie)
+        if not ruta.exists():
+            return None
+        with pa.memory_map(str(ruta)) as fuente:
+            metadatos = pa.ipc.open_file(fuente).schema.metadata or {}
+        valor = metadatos.get(CLAVE_HASH)
+        return valor.decode() if valor else None
+
+    def escribir(self, serie: str, df: pd.DataFrame) -> bool:
+        """Reemplaza la serie de forma atómica (archivo temporal + renombrado).
+
+        Si el contenido es idéntico al guardado no escribe nada y devuelve False.
+        """
+        df = df.reset_index(drop=True)
+        firma = hash_de(df)
+        if firma == self.hash(serie):
+            return False
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = self.ruta(serie)
+        tmp = ruta.with_name(ruta.name + ".tmp")
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), CLAVE_HASH: firma.encode()})
+        feather.write_feather(tabla, tmp, compression='uncompressed')
+        os.replace(tmp, ruta)
+        return True
+
+    def borrar(self, serie: str):
+        self.ruta(serie).unlink(missing_ok=True)
@@ -0,0 +1,126 @@
+"""Caché en disco de respuestas HTTP con peticiones condicionales.
+
+Para cada URL guarda el cuerpo de la última respuesta, su hash y los validadores
+(ETag / Last-Modified), y en la próxima consulta envía If-None-Match / If-Modified-Since.
+Si el servidor responde 304, o devuelve exactamente el mismo contenido, la respuesta
+se informa como "sin cambios" y el llamador puede omitir todo el procesamiento.
+
+Las respuestas nuevas quedan pendientes hasta `confirmar()`, que se llama recién
+cuando sus datos ya se guardaron: si la corrida falla, la próxima vuelve a procesarlas.
+El tamaño total está acotado y se descartan primero las URLs usadas hace más tiempo.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from cotizaciones import metricas
+from cotizaciones.cliente_http import cliente
+
+INDICE = "indice.json"
+LIMITE_POR_DEFECTO = 20 * 1024 * 1024
+
+
+class CacheHTTP:
+    """Respuestas guardadas en `directorio`: un archivo por URL más un índice JSON."""
+
+    def __init__(self, directorio: Path, limite_bytes: int = LIMITE_POR_DEFECTO):
+        self.directorio = directorio
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        self._entradas = None
+        self._pendientes = {}
+        self._usadas = {}
+
+    def _ruta_cuerpo(self, url: str) -> Path:
+        return self.directorio / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]}.body"
+
+    def _indice(self) -> dict:
+        if self._entradas is None:
+            try:
+                with open(self.directorio / INDICE, 'r', encoding='utf-8') as f:
+                    self._entradas = json.load(f)
+            except (OSError, ValueError):
+                self._entradas = {}
+        return self._entradas
+
+    def consultar(self, url: str, fuente: str, headers: dict | None = None, **kwargs) -> tuple[bytes, bool]:
+        """Descarga `url` de forma condicional. Devuelve (cuerpo, cambió respecto de lo guardado).
+
+        La respuesta queda pendiente a nombre de `fuente` hasta `confirmar`. Lanza
+        requests.HTTPError ante respuestas de error, igual que raise_for_status.
+        """
+        with self._lock:
+            entrada = self._indice().get(url)
+        ruta = self._ruta_cuerpo(url)
+        if entrada is not None and not ruta.exists():
+            entrada = None
+
+        headers = dict(headers or {})
+        if entrada is not None:
+            if entrada.get("etag"):
+                headers['If-None-Match'] = entrada["etag"]
+            if entrada.get("last_modified"):
+                headers['If-Modified-Since'] = entrada["last_modified"]
+
+        r = cliente.get(url, headers=headers, **kwargs)
+        if r.status_code == 304 and entrada is not None:
+            with self._lock:
+                self._usadas[url] = fuente
+            metricas.sumar("cache_http", 1, fuente=fuente, resultado="304")
+            return ruta.read_bytes(), False
+        r.raise_for_status()
+
+        cuerpo = r.content
+        hash_cuerpo = hashlib.sha256(cuerpo).hexdigest()
+        nueva = {
+            "etag": r.headers.get('ETag'),
+            "last_modified": r.headers.get('Last-Modified'),
+            "hash": hash_cuerpo,
+            "bytes": len(cuerpo),
+        }
+        with self._lock:
+            self._pendientes[url] = (fuente, nueva, cuerpo)
+        cambio = entrada is None or entrada.get("hash") != hash_cuerpo
+        metricas.sumar("cache_http", 1, fuente=fuente, resultado="nuevo" if cambio else "mismo_contenido")
+        return cuerpo, cambio
+
+    def confirmar(self, fuentes: Iterable[str]):
+        """Guarda las respuestas pendientes de `fuentes` (las que llegaron a procesarse),
+        descarta el resto y aplica el límite de tamaño (LRU)."""
+        fuentes = set(fuentes)
+        with self._lock:
+            pendientes = {url: p for url, p in self._pendientes.items() if p[0] in fuentes}
+            usadas = {url for url, fuente in self._usadas.items() if fuente in fuentes}
+            self._pendientes.clear()
+            self._usadas.clear()
+            if not pendientes and not usadas:
+                return
+            entradas = self._indice()
+            ahora = time.time()
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            for url, (_, entrada, cuerpo) in pendientes.items():
+                _escribir_atomico(self._ruta_cuerpo(url), cuerpo)
+                entradas[url] = entrada
+            for url in pendientes.keys() | usadas:
+                if url in entradas:
+                    entradas[url]["usado"] = ahora
+
+            total = sum(e.get("bytes", 0) for e in entradas.values())
+            for url in sorted(entradas, key=lambda u: entradas[u].get("usado", 0)):
+                if total <= self.limite_bytes:
+                    break
+                total -= entradas.pop(url).get("bytes", 0)
+                self._ruta_cuerpo(url).unlink(missing_ok=True)
+
+            _escribir_atomico(self.directorio / INDICE, json.dumps(entradas, indent=1).encode('utf-8'))
+
+
+def _escribir_atomico(ruta: Path, contenido: bytes):
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, 'wb') as f:
+        f.write(contenido)
+    os.replace(tmp, ruta)
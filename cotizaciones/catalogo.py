@@ -0,0 +1,191 @@
+"""Catálogo de fuentes: qué hoja actualiza cada una, cómo se arma su descarga y cada cuánto se consulta.
+
+Las series diarias (BNA, MEP, Libre, Pizarra Rosario) se consultan una vez por día. Las
+mensuales se consultan a diario solo durante su ventana de publicación (los días del mes
+en que el organismo suele publicar el dato nuevo) y, fuera de ella, una vez por semana por
+si revisó algún valor. Así una corrida programada solo pide las fuentes que tienen algo
+nuevo esperable (ver `vencidas`); la fecha de la última consulta de cada fuente queda en
+config.json (ver config.registrar_consultas).
+
+La página solo usa las cadencias: las descargas (pandas, requests, el almacén) se
+importan recién al planificar una corrida.
+"""
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from cotizaciones.hojas import (
+    EXCEL_SHEET, EXCEL_COLUMNS, MEP_SHEET, MEP_COLUMNS, LIBRE_SHEET, LIBRE_COLUMNS, UVA_SHEET, UVA_COLUMNS,
+    CAC_SHEET, CAC_COLUMNS, SMVYM_SHEET, SMVYM_COLUMNS, IPC_SHEET, IPC_COLUMNS,
+    ROSARIO_SHEET, ROSARIO_COLUMNS_ORDER, ROSARIO_START_DATE, ROSARIO_SOLAPAMIENTO_DIAS, SERIES_SOLAPAMIENTO_MESES,
+    CLAVE_POR_HOJA, FORMATOS_POR_HOJA,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from cotizaciones.cache_http import CacheHTTP
+
+# Tiempo máximo de espera (segundos) por fuente, reintentos incluidos.
+# Los timeouts de conexión/lectura de cada petición se definen en cotizaciones/cliente_http.py
+TIMEOUT_POR_DEFECTO = 90
+
+# Algo menos de un día, para que una tarea diaria a hora fija encuentre vencidas las series diarias
+CADENCIA_DIARIA = timedelta(hours=20)
+CADENCIA_SEMANAL = timedelta(days=7)
+
+# Primer día que se pide de las series diarias cuando la hoja está vacía
+INICIO_POR_DEFECTO = date(2023, 1, 1)
+
+
+class Planificacion:
+    """Lo que necesitan las fuentes para armar su descarga; se lee una vez por corrida, sin cargar el libro."""
+
+    def __init__(self, ruta_excel: Path, hoy: date, hojas: list[str], cache: "CacheHTTP | None" = None):
+        from cotizaciones.almacen import Almacen
+        from cotizaciones.libro import leer_ultimas_fechas
+
+        self.ruta_excel = ruta_excel
+        self.hoy = hoy
+        self.ayer = hoy - timedelta(days=1)
+        self.ultimas = leer_ultimas_fechas(ruta_excel, hojas)
+        self.cache = cache
+        self._almacen = Almacen(ruta_excel)
+
+    def siguiente_dia(self, hoja: str) -> date:
+        """Día siguiente al último guardado en la hoja (o INICIO_POR_DEFECTO si está vacía)."""
+        ultima = self.ultimas.get(hoja)
+        return ultima + timedelta(days=1) if ultima else INICIO_POR_DEFECTO
+
+    def cache_si_guardada(self, hoja: str) -> "CacheHTTP | None":
+        # Sin la serie guardada, un "sin cambios" dejaría la hoja vacía: se descarga completa
+        return self.cache if self._almacen.existe(hoja) else None
+
+
+@dataclass(frozen=True)
+class Fuente:
+    """Una fuente de datos y la hoja que actualiza.
+
+    `descarga(plan)` devuelve la función que baja lo nuevo, o None si no hay nada que pedir.
+    Esa función lanza DescargaFallida si la consulta falla, así la fuente no se da por consultada.
+    `ventana` son los días del mes (1 a 28) en que se suele publicar el dato nuevo: dentro de
+    ella se consulta cada `cadencia` y fuera, cada `cadencia_fuera_de_ventana`.
+    """
+    nombre: str
+    hoja: str
+    columnas: list[str]
+    descarga: "Callable[[Planificacion], Callable[[], pd.DataFrame] | None]"
+    cadencia: timedelta = CADENCIA_DIARIA
+    ventana: tuple[int, int] | None = None
+    cadencia_fuera_de_ventana: timedelta = CADENCIA_SEMANAL
+    timeout: float = TIMEOUT_POR_DEFECTO
+
+    @property
+    def clave(self) -> str:
+        return CLAVE_POR_HOJA[self.hoja]
+
+    @property
+    def formatos(self) -> dict:
+        # La Pizarra Rosario tiene su propio estilo (ver libro.guardar_rosario_con_estilo)
+        return FORMATOS_POR_HOJA.get(self.hoja, {})
+
+    def proxima_consulta(self, ultima: datetime | None) -> datetime:
+        """Cuándo vuelve a corresponder consultarla, según la última consulta exitosa."""
+        if ultima is None:
+            return datetime.min
+        proxima = ultima + self.cadencia
+        if self.ventana is None:
+            return proxima
+        inicio, fin = self.ventana
+        if inicio <= proxima.day <= fin:
+            return proxima
+        apertura = proxima.replace(day=inicio, hour=0, minute=0, second=0, microsecond=0)
+        if apertura < proxima:
+            anio, mes = divmod(apertura.year * 12 + apertura.month, 12)
+            apertura = apertura.replace(year=anio, month=mes + 1)
+        return min(apertura, ultima + self.cadencia_fuera_de_ventana)
+
+
+# --- DESCARGAS ---
+
+def _obtener(nombre: str):
+    """La función `nombre` de cotizaciones/fuentes.py."""
+    from cotizaciones import fuentes
+    return getattr(fuentes, nombre)
+
+def _descarga_bna(plan: Planificacion):
+    desde = plan.siguiente_dia(EXCEL_SHEET)
+    if desde > plan.ayer:
+        return None
+    return partial(_obtener("obtener_cotizaciones"), desde.strftime("%d/%m/%Y"), plan.ayer.strftime("%d/%m/%Y"), estricto=True)
+
+def _descarga_diaria(obtener: str, hoja: str, hasta_hoy: bool = False):
+    """Descarga desde el día siguiente al último guardado hasta ayer (u hoy)."""
+    def descarga(plan: Planificacion):
+        desde = plan.siguiente_dia(hoja)
+        hasta = plan.hoy if hasta_hoy else plan.ayer
+        return partial(_obtener(obtener), desde, hasta, estricto=True) if desde <= hasta else None
+    return descarga
+
+def _descarga_completa(obtener: str, hoja: str):
+    """Serie completa, salvo que la caché HTTP indique que no cambió."""
+    def descarga(plan: Planificacion):
+        return partial(_obtener(obtener), plan.cache_si_guardada(hoja), estricto=True)
+    return descarga
+
+def _descarga_mensual(obtener: str, hoja: str):
+    """Series de datos.gob.ar: solo lo posterior al último período guardado (con solapamiento)."""
+    def descarga(plan: Planificacion):
+        import pandas as pd
+
+        ultima = plan.ultimas.get(hoja)
+        desde = (pd.Timestamp(ultima) - pd.DateOffset(months=SERIES_SOLAPAMIENTO_MESES)).date() if ultima else None
+        return partial(_obtener(obtener), desde, plan.cache_si_guardada(hoja), estricto=True)
+    return descarga
+
+def _descarga_rosario(plan: Planificacion):
+    from cotizaciones.libro import leer_ultimo_estado_rosario
+
+    import pandas as pd
+
+    estado = leer_ultimo_estado_rosario(plan.ruta_excel)
+    if estado.empty:
+        desde = pd.Timestamp(ROSARIO_START_DATE)
+    else:
+        desde = estado["Fecha"].max() - pd.Timedelta(days=ROSARIO_SOLAPAMIENTO_DIAS - 1)
+    return partial(_obtener("obtener_datos_rosario"), desde, plan.ayer, estado, estricto=True)
+
+
+# --- CATÁLOGO ---
+
+FUENTES = [
+    Fuente("BNA", EXCEL_SHEET, EXCEL_COLUMNS, _descarga_bna, timeout=150),
+    Fuente("MEP", MEP_SHEET, MEP_COLUMNS, _descarga_diaria("obtener_mep", MEP_SHEET)),
+    Fuente("LIBRE", LIBRE_SHEET, LIBRE_COLUMNS, _descarga_diaria("obtener_libre", LIBRE_SHEET, hasta_hoy=True)),
+    # El BCRA publica a principio de mes los valores de la UVA hasta el día 6 del mes siguiente
+    Fuente("UVA", UVA_SHEET, UVA_COLUMNS, _descarga_completa("obtener_uva", UVA_SHEET), timedelta(days=1), (1, 10)),
+    Fuente("CAC", CAC_SHEET, CAC_COLUMNS, _descarga_completa("obtener_cac", CAC_SHEET), timedelta(days=1), (10, 25)),
+    # El salario mínimo se fija por resolución, sin fecha de publicación previsible
+    Fuente("SMVyM", SMVYM_SHEET, SMVYM_COLUMNS, _descarga_mensual("obtener_smvym", SMVYM_SHEET), CADENCIA_SEMANAL),
+    Fuente("IPC", IPC_SHEET, IPC_COLUMNS, _descarga_mensual("obtener_ipc", IPC_SHEET), timedelta(days=1), (8, 16)),
+    Fuente("ROSARIO", ROSARIO_SHEET, ROSARIO_COLUMNS_ORDER, _descarga_rosario, timeout=150),
+]
+FUENTE_POR_NOMBRE = {fuente.nombre: fuente for fuente in FUENTES}
+# Hoja que actualiza cada fuente
+HOJA_POR_FUENTE = {fuente.nombre: fuente.hoja for fuente in FUENTES}
+
+
+def seleccionar(solo: set[str] | None = None) -> list[Fuente]:
+    """Las fuentes cuya hoja está en `solo` (todas si es None)."""
+    return [fuente for fuente in FUENTES if solo is None or fuente.hoja in solo]
+
+def vencidas(fuentes: list[Fuente], consultas: dict[str, datetime], ahora: datetime) -> list[Fuente]:
+    """Las fuentes a las que ya les corresponde una consulta según su cadencia."""
+    return [fuente for fuente in fuentes if ahora >= fuente.proxima_consulta(consultas.get(fuente.nombre))]
+
+def proxima_consulta(fuentes: list[Fuente], consultas: dict[str, datetime]) -> datetime:
+    """La próxima vez que alguna de las fuentes tenga una consulta pendiente."""
+    return min(fuente.proxima_consulta(consultas.get(fuente.nombre)) for fuente in fuentes)
@@ -0,0 +1,108 @@
+"""Cliente HTTP compartido por todas las fuentes.
+
+Mantiene un pool de conexiones keep-alive por host, reintenta con backoff
+exponencial (con jitter y respetando Retry-After) y define los timeouts de
+conexión/lectura de cada host. La verificación SSL solo se desactiva para GGSA.
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from cotizaciones import metricas
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# La API de GGSA tiene un certificado inválido: es el único host sin verificación SSL
+HOSTS_SIN_VERIFICACION_SSL = {"www.ggsa.com.ar"}
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# (timeout de conexión, timeout de lectura) en segundos
+TIMEOUT_POR_DEFECTO = (10, 30)
+TIMEOUTS_POR_HOST = {
+    "portalerrepar.errepar.com": (10, 60),
+    "www.ggsa.com.ar": (10, 60),
+}
+
+MAX_REINTENTOS = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAXIMO = 30.0
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Conexiones simultáneas por host (la descarga concurrente usa varias contra ámbito)
+POOL_POR_HOST = 4
+
+
+class ClienteHTTP:
+    """Sesión HTTP única con pools por host, reintentos y timeouts por fuente."""
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=len(TIMEOUTS_POR_HOST) + 8, pool_maxsize=POOL_POR_HOST, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def request(self, metodo: str, url: str, timeout: tuple | None = None,
+                reintentables: set[int] = ESTADOS_REINTENTABLES, **kwargs) -> requests.Response:
+        """Realiza la petición reintentando errores de red y las respuestas con estado en `reintentables`.
+
+        Devuelve la última respuesta obtenida (el llamador decide si usar raise_for_status)
+        o relanza la última excepción de red si se agotaron los reintentos.
+        """
+        host = urlsplit(url).hostname or ''
+        timeout = timeout or TIMEOUTS_POR_HOST.get(host, TIMEOUT_POR_DEFECTO)
+        verify = host not in HOSTS_SIN_VERIFICACION_SSL
+
+        for intento in range(MAX_REINTENTOS + 1):
+            ultimo = intento == MAX_REINTENTOS
+            try:
+                response = self.session.request(metodo, url, timeout=timeout, verify=verify, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if ultimo:
+                    raise
+                espera = _backoff(intento)
+            else:
+                if response.status_code not in reintentables or ultimo:
+                    metricas.sumar("bytes_descargados", len(response.content), host=host)
+                    return response
+                espera = _retry_after(response)
+                if espera is None:
+                    espera = _backoff(intento)
+                response.close()
+            metricas.sumar("reintentos_http", 1, host=host)
+            time.sleep(espera)
+
+
+def _backoff(intento: int) -> float:
+    """Backoff exponencial con 'full jitter'."""
+    return random.uniform(0, min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** intento))
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    """Interpreta la cabecera Retry-After (segundos o fecha HTTP), acotada a BACKOFF_MAXIMO."""
+    valor = response.headers.get('Retry-After')
+    if not valor:
+        return None
+    try:
+        segundos = float(valor)
+    except ValueError:
+        try:
+            segundos = (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(segundos, 0.0), BACKOFF_MAXIMO)
+
+
+cliente = ClienteHTTP()
@@ -0,0 +1,88 @@
+"""Configuración persistente (config.json) y ruta del Excel de destino.
+
+El contenido se guarda en memoria junto con la fecha de modificación y el tamaño del
+archivo, y solo se vuelve a leer del disco cuando alguno de los dos cambió.
+"""
+import copy
+import json
+import os
+from collections.abc import Iterable
+from datetime import datetime
+from pathlib import Path
+
+CONFIG_FILE = "config.json"
+
+# Ruta -> (firma del archivo, contenido) de la última lectura o escritura
+_leidas: dict[str, tuple[tuple, dict]] = {}
+
+
+def _firma(ruta: str) -> tuple | None:
+    try:
+        stat = os.stat(ruta)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def cargar_config():
+    """Copia del contenido de config.json ({} si no existe); se lee del disco solo si el archivo cambió."""
+    ruta = CONFIG_FILE
+    firma = _firma(ruta)
+    if firma is None:
+        return {}
+    leida = _leidas.get(ruta)
+    if leida is None or leida[0] != firma:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            leida = _leidas[ruta] = (firma, json.load(f))
+    # Copia: quien la modifica y después la guarda no altera la que queda en memoria
+    return copy.deepcopy(leida[1])
+
+def guardar_config(config):
+    ruta = CONFIG_FILE
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=4)
+    # La próxima lectura va al disco (otro proceso podría escribir entre este guardado y el stat)
+    _leidas.pop(ruta, None)
+
+def excel_path() -> Path:
+    config = cargar_config()
+    ruta = config.get('excel_path', '')
+    return Path(ruta)
+
+def registrar_actualizacion():
+    """Guarda en el disco la fecha y hora de la última actualización completa."""
+    config = cargar_config()
+    config['last_update'] = datetime.now().isoformat()
+    guardar_config(config)
+
+def ultima_actualizacion(config: dict | None = None) -> datetime:
+    """Fecha y hora de la última actualización completa (datetime.min si nunca se actualizó)."""
+    config = cargar_config() if config is None else config
+    last_update_str = config.get('last_update')
+    if last_update_str:
+        try:
+            return datetime.fromisoformat(last_update_str)
+        except ValueError:
+            return datetime.min
+    return datetime.min
+
+def registrar_consultas(fuentes: Iterable[str]):
+    """Guarda la fecha y hora en que se consultó con éxito cada fuente (ver cotizaciones/catalogo.py)."""
+    config = cargar_config()
+    ahora = datetime.now().isoformat()
+    config.setdefault('consultas', {}).update({fuente: ahora for fuente in fuentes})
+    guardar_config(config)
+
+def ultimas_consultas(fuentes: Iterable[str], config: dict | None = None) -> dict[str, datetime | None]:
+    """Última consulta exitosa de cada fuente (None si nunca se consultó). Las que no tienen registro
+    propio (config.json de versiones anteriores) toman la última actualización completa."""
+    config = cargar_config() if config is None else config
+    ultima = ultima_actualizacion(config)
+    por_defecto = None if ultima == datetime.min else ultima
+    registradas = config.get('consultas', {})
+    consultas = {}
+    for fuente in fuentes:
+        try:
+            consultas[fuente] = datetime.fromisoformat(registradas[fuente])
+        except (KeyError, TypeError, ValueError):
+            consultas[fuente] = por_defecto
+    return consultas
@@ -0,0 +1,106 @@
+"""Coordinación entre corridas simultáneas sobre el mismo Excel.
+
+Dos sesiones de la página, o la página y una tarea programada, pueden disparar la
+actualización a la vez. Dentro de un proceso, `una_sola_vez` hace que un pedido igual al
+que está en curso espere y reciba su resultado en lugar de repetirlo; entre procesos,
+`BloqueoArchivo` toma un lock advisory (fcntl en Linux/macOS, msvcrt en Windows) sobre un
+archivo junto al Excel, así nunca hay dos corridas escribiendo el mismo libro.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# Cada cuánto se vuelve a intentar tomar un lock ocupado (segundos)
+INTERVALO_SONDEO = 0.5
+
+
+def ruta_bloqueo(excel_path: Path) -> Path:
+    return excel_path.with_name(f".{excel_path.name}.lock")
+
+def _bloquear(fd: int):
+    if os.name == 'nt':
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+def _desbloquear(fd: int):
+    if os.name == 'nt':
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class BloqueoArchivo:
+    """Lock exclusivo entre procesos sobre `ruta`. El archivo no se borra al liberarlo."""
+
+    def __init__(self, ruta: Path):
+        self.ruta = ruta
+        self._fd = None
+
+    def adquirir(self, espera: float = 0.0) -> bool:
+        """Intenta tomar el lock durante hasta `espera` segundos; devuelve False si sigue ocupado."""
+        fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        limite = time.monotonic() + espera
+        while True:
+            try:
+                _bloquear(fd)
+            except OSError:
+                if time.monotonic() >= limite:
+                    os.close(fd)
+                    return False
+                time.sleep(INTERVALO_SONDEO)
+            else:
+                self._fd = fd
+                return True
+
+    def liberar(self):
+        if self._fd is None:
+            return
+        try:
+            _desbloquear(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+_en_curso: dict = {}
+_en_curso_lock = threading.Lock()
+
+
+def una_sola_vez(clave, funcion, al_esperar=None):
+    """Ejecuta `funcion()`, salvo que ya haya una llamada con la misma `clave` en curso en este
+    proceso: en ese caso llama a `al_esperar` (si se indicó), espera y devuelve el mismo resultado."""
+    with _en_curso_lock:
+        futuro = _en_curso.get(clave)
+        propio = futuro is None
+        if propio:
+            futuro = _en_curso[clave] = Future()
+    if not propio:
+        if al_esperar is not None:
+            al_esperar()
+        return futuro.result()
+
+    try:
+        resultado = funcion()
+    except Exception as e:
+        futuro.set_exception(e)
+        raise
+    except BaseException:
+        # Ej. la página se detuvo a mitad de la corrida: los que esperaban la dan por fallida
+        futuro.set_result(False)
+        raise
+    else:
+        futuro.set_result(resultado)
+        return resultado
+    finally:
+        with _en_curso_lock:
+            del _en_curso[clave]
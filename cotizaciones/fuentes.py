@@ -0,0 +1,417 @@
+"""Descarga y normalización de cada fuente de datos (BNA, Ámbito, APIs de índices y GGSA)."""
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+import lxml.html
+import requests
+from lxml import etree
+
+from cotizaciones import config, metricas
+from cotizaciones.cache_http import CacheHTTP
+from cotizaciones.cliente_http import cliente, ESTADOS_REINTENTABLES, USER_AGENT
+from cotizaciones.hojas import (
+    EXCEL_COLUMNS, MEP_COLUMNS, LIBRE_COLUMNS, ROSARIO_MAP,
+)
+from cotizaciones.reporte import reporte
+from cotizaciones.series import a_datetime64, normalizar_formato_fecha
+
+# --- CONFIGURACIÓN DE CONSTANTES Y CONEXIÓN ---
+URL = "https://portalerrepar.errepar.com/CotizacionDolarPage"
+HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Referer': URL
+}
+
+AMBITO_MEP_URL_TMPL = "https://mercados.ambito.com//dolarrava/mep/grafico/{desde}/{hasta}"
+AMBITO_LIBRE_URL_TMPL = "https://mercados.ambito.com//dolar/informal/historico-general/{desde}/{hasta}"
+UVA_URL = "https://api.argentinadatos.com/v1/finanzas/indices/uva/"
+CAC_URL = "https://prestamos.ikiwi.net.ar/api/cacs"
+SERIES_API_URL = "https://apis.datos.gob.ar/series/api/series/"
+SERIES_LIMITE = 5000
+SMVYM_SERIE_ID = "57.1_SMVMM_0_M_34"
+IPC_SERIE_ID = "145.3_INGNACNAL_DICI_M_15"
+ROSARIO_URL_TMPL = "https://www.ggsa.com.ar/get_pizarra/pros59/{desde}/{hasta}/"
+
+FIXED_PAYLOAD = {
+    'ctl00$ScriptManager1': 'ctl00$ContentPlaceHolder1$updPnl|ctl00$ContentPlaceHolder1$btnBuscar',
+    '__EVENTTARGET': '',
+    '__EVENTARGUMENT': '',
+    '__ASYNCPOST': 'true',
+    'ctl00$ContentPlaceHolder1$btnBuscar': 'VER DATOS'
+}
+
+POST_HEADERS = HEADERS.copy()
+POST_HEADERS.update({
+    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    'X-Requested-With': 'XMLHttpRequest'
+})
+
+# Vigencia del estado de página (ViewState) de Errepar. Se guarda junto a config.json para
+# reutilizarlo entre corridas; si el servidor lo rechaza antes de vencer, se pide uno nuevo.
+VIEWSTATE_TTL = 7 * 24 * 3600
+VIEWSTATE_ARCHIVO = "viewstate_errepar.json"
+CAMPOS_VIEWSTATE = ("__VIEWSTATE", "__VIEWSTATEGENERATOR", "__EVENTVALIDATION")
+_cache_viewstate = {"campos": None, "obtenido": 0.0}
+
+# Días por consulta a Errepar: los rellenos largos se piden por tramos
+BNA_DIAS_POR_CONSULTA = 120
+BNA_PANEL = "ContentPlaceHolder1_updPnl"
+BNA_COLUMNAS_NUMERICAS = ['Billete Compra', 'Billete Venta', 'Divisa Compra', 'Divisa Venta']
+
+_XPATH_CAMPOS_VIEWSTATE = etree.XPath("//input[@id=$campo]/@value")
+_XPATH_FILAS_BNA = etree.XPath("(//table[contains(concat(' ', normalize-space(@class), ' '), ' table ')])[1]//tr")
+_XPATH_CELDAS = etree.XPath("td")
+
+
+class ViewStateRechazado(Exception):
+    """Errepar no aceptó el estado de página enviado (vencido o de otra versión del sitio)."""
+
+
+class DescargaFallida(Exception):
+    """Con `estricto=True`, la consulta falló (a diferencia de una respuesta sin datos)."""
+
+
+# --- FUNCIONES DE SCRAPING (BNA) ---
+
+def ruta_viewstate() -> Path:
+    return Path(config.CONFIG_FILE).with_name(VIEWSTATE_ARCHIVO)
+
+def _viewstate_valido(campos, obtenido) -> bool:
+    return (
+        isinstance(campos, dict) and all(campos.get(c) for c in CAMPOS_VIEWSTATE)
+        and isinstance(obtenido, (int, float)) and 0 <= time.time() - obtenido < VIEWSTATE_TTL
+    )
+
+def _leer_viewstate_guardado() -> dict | None:
+    try:
+        guardado = json.loads(ruta_viewstate().read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(guardado, dict) or not _viewstate_valido(guardado.get("campos"), guardado.get("obtenido")):
+        return None
+    _cache_viewstate.update(campos=guardado["campos"], obtenido=guardado["obtenido"])
+    return guardado["campos"]
+
+def _guardar_viewstate(campos: dict):
+    _cache_viewstate.update(campos=campos, obtenido=time.time())
+    ruta = ruta_viewstate()
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    try:
+        tmp.write_text(json.dumps(dict(_cache_viewstate)), encoding='utf-8')
+        os.replace(tmp, ruta)
+    except OSError:
+        pass
+
+def descartar_viewstate():
+    _cache_viewstate.update(campos=None, obtenido=0.0)
+    ruta_viewstate().unlink(missing_ok=True)
+
+def get_dynamic_payload_fields(renovar: bool = False):
+    """Campos de estado de la página de Errepar, reutilizados (también entre corridas) durante VIEWSTATE_TTL segundos."""
+    if not renovar:
+        if _viewstate_valido(_cache_viewstate["campos"], _cache_viewstate["obtenido"]):
+            return {**_cache_viewstate["campos"], **FIXED_PAYLOAD}
+        campos = _leer_viewstate_guardado()
+        if campos is not None:
+            return {**campos, **FIXED_PAYLOAD}
+
+    reporte.info("🔄 Obteniendo estado de página (ViewState) de Errepar...")
+    try:
+        initial_response = cliente.get(URL, headers=HEADERS)
+        initial_response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        reporte.error(f"❌ Error de conexión inicial con Errepar: {e}")
+        return None
+
+    raiz = lxml.html.fromstring(initial_response.content)
+    campos = {}
+    for campo in CAMPOS_VIEWSTATE:
+        valores = _XPATH_CAMPOS_VIEWSTATE(raiz, campo=campo)
+        if not valores:
+            reporte.error("❌ Fallo al encontrar campos de estado en Errepar.")
+            return None
+        campos[campo] = str(valores[0])
+
+    _guardar_viewstate(campos)
+    return {**campos, **FIXED_PAYLOAD}
+
+def entradas_delta(texto: str) -> list[tuple[str, str, str]]:
+    """Separa una respuesta parcial de ASP.NET (largo|tipo|id|contenido|...) en (tipo, id, contenido).
+
+    Cada contenido se toma por su largo declarado, sin buscar marcadores dentro del HTML.
+    Lanza ValueError si la respuesta no tiene ese formato.
+    """
+    entradas = []
+    pos = 0
+    while pos < len(texto):
+        fin_largo = texto.index('|', pos)
+        fin_tipo = texto.index('|', fin_largo + 1)
+        fin_id = texto.index('|', fin_tipo + 1)
+        inicio = fin_id + 1
+        fin = inicio + int(texto[pos:fin_largo])
+        if texto[fin:fin + 1] != '|':
+            raise ValueError("respuesta parcial de ASP.NET mal formada")
+        entradas.append((texto[fin_largo + 1:fin_tipo], texto[fin_tipo + 1:fin_id], texto[inicio:fin]))
+        pos = fin + 1
+    return entradas
+
+def _panel_bna(texto: str) -> str | None:
+    """HTML del panel con la tabla de cotizaciones. Lanza ViewStateRechazado si el servidor devolvió un error."""
+    try:
+        entradas = entradas_delta(texto)
+    except ValueError:
+        # Largos que no cierran (ej. caracteres fuera del BMP): se busca el panel por su marcador
+        marcador = f"updatePanel|{BNA_PANEL}|"
+        inicio = texto.find(marcador)
+        if inicio == -1:
+            return None
+        inicio += len(marcador)
+        fin = texto.find('|0|hiddenField|__EVENTTARGET', inicio)
+        return texto[inicio:fin if fin != -1 else None]
+    for tipo, id_, contenido in entradas:
+        if tipo in ("error", "pageRedirect"):
+            raise ViewStateRechazado(contenido or id_)
+        if tipo == "updatePanel" and id_ == BNA_PANEL:
+            return contenido
+    return None
+
+def parsear_tabla_bna(html: str) -> list[list[str]]:
+    """Filas de la tabla de cotizaciones (sin los dos encabezados ni el pie), con sus 5 celdas como texto."""
+    if not html or not html.strip():
+        return []
+    raiz = lxml.html.fragment_fromstring(html, create_parent='div')
+    filas = []
+    for tr in _XPATH_FILAS_BNA(raiz)[2:-1]:
+        celdas = _XPATH_CELDAS(tr)
+        if len(celdas) == 5:
+            filas.append([celda.text_content().strip() for celda in celdas])
+    return filas
+
+def _consultar_bna(desde: date, hasta: date) -> list[list[str]]:
+    """Una consulta a Errepar; si rechaza el ViewState se pide uno nuevo y se reintenta una vez."""
+    for renovar in (False, True):
+        base_payload = get_dynamic_payload_fields(renovar)
+        if base_payload is None:
+            raise ViewStateRechazado("no se pudo obtener el estado de página")
+        payload = {
+            **base_payload,
+            'ctl00$ContentPlaceHolder1$inputDateDesde': desde.strftime("%d/%m/%Y"),
+            'ctl00$ContentPlaceHolder1$inputDateHasta': hasta.strftime("%d/%m/%Y"),
+        }
+        # Un 500 es el ViewState rechazado: se renueva en lugar de repetir el mismo POST con backoff
+        response = cliente.post(URL, data=payload, headers=POST_HEADERS, reintentables=ESTADOS_REINTENTABLES - {500})
+        try:
+            if response.status_code == 500:
+                raise ViewStateRechazado(f"HTTP {response.status_code}")
+            response.raise_for_status()
+            return parsear_tabla_bna(_panel_bna(response.text))
+        except ViewStateRechazado:
+            descartar_viewstate()
+            if renovar:
+                raise
+            reporte.warning("🔄 Errepar rechazó el estado de página guardado; se pide uno nuevo.")
+
+def _tramos(desde: date, hasta: date, dias: int) -> list[tuple[date, date]]:
+    tramos = []
+    while desde <= hasta:
+        fin = min(hasta, desde + timedelta(days=dias - 1))
+        tramos.append((desde, fin))
+        desde = fin + timedelta(days=1)
+    return tramos
+
+@metricas.medida()
+def obtener_cotizaciones(fecha_desde: str, fecha_hasta: str, estricto: bool = False) -> pd.DataFrame:
+    """Cotizaciones BNA entre dos fechas dd/mm/aaaa, pedidas en tramos de BNA_DIAS_POR_CONSULTA días.
+
+    Si un tramo falla se devuelve lo obtenido hasta el anterior, así la próxima corrida
+    retoma desde ahí sin dejar huecos (con `estricto` se lanza DescargaFallida).
+    """
+    desde = datetime.strptime(fecha_desde, "%d/%m/%Y").date()
+    hasta = datetime.strptime(fecha_hasta, "%d/%m/%Y").date()
+    tramos = _tramos(desde, hasta, BNA_DIAS_POR_CONSULTA)
+
+    data = []
+    for i, (inicio, fin) in enumerate(tramos, start=1):
+        tramo = f" (tramo {i}/{len(tramos)})" if len(tramos) > 1 else ""
+        reporte.info(f"🔎 Solicitando datos de BNA desde **{inicio:%d/%m/%Y}** hasta **{fin:%d/%m/%Y}**{tramo}...")
+        try:
+            data += _consultar_bna(inicio, fin)
+        except Exception as e:
+            if estricto:
+                raise DescargaFallida(f"BNA: {e}") from e
+            reporte.error(f"❌ Error BNA: {e}")
+            break
+
+    if not data:
+        return pd.DataFrame()
+    try:
+        df = pd.DataFrame(data, columns=EXCEL_COLUMNS)
+        df[BNA_COLUMNAS_NUMERICAS] = df[BNA_COLUMNAS_NUMERICAS].apply(lambda col: pd.to_numeric(col.str.replace(',', '.')))
+        return normalizar_formato_fecha(df, 'Fecha', dayfirst=True)
+    except Exception as e:
+        if estricto:
+            raise DescargaFallida(f"BNA: {e}") from e
+        reporte.error(f"❌ Error BNA: {e}")
+        return pd.DataFrame()
+
+# --- APIS GENERALES ---
+
+# Resultado de obtener_datos_api cuando la respuesta es igual a la ya procesada; los
+# obtener_* devuelven entonces un DataFrame vacío y la hoja no se vuelve a escribir
+SIN_CAMBIOS = object()
+
+def obtener_datos_api(url: str, source_name: str, cache: CacheHTTP | None = None, estricto: bool = False) -> dict | list | None:
+    """JSON de la API. Con `cache` la consulta es condicional y devuelve SIN_CAMBIOS si nada cambió.
+
+    Ante un error devuelve None, o lanza DescargaFallida si `estricto`.
+    """
+    reporte.info(f"🔎 Consultando API de {source_name}...")
+    try:
+        if cache is None:
+            r = cliente.get(url)
+            r.raise_for_status()
+            contenido = r.json()
+        else:
+            cuerpo, cambio = cache.consultar(url, source_name)
+            if not cambio:
+                reporte.info(f"💤 {source_name}: sin cambios desde la última descarga.")
+                return SIN_CAMBIOS
+            contenido = json.loads(cuerpo)
+        reporte.success(f"✅ Respuesta de API {source_name} recibida.")
+        return contenido
+    except Exception as e:
+        if estricto:
+            raise DescargaFallida(f"{source_name}: {e}") from e
+        reporte.error(f"❌ Error {source_name}: {e}")
+        return None
+
+@metricas.medida()
+def obtener_mep(desde: date, hasta: date, estricto: bool = False) -> pd.DataFrame:
+    url = AMBITO_MEP_URL_TMPL.format(desde=desde.strftime('%Y-%m-%d'), hasta=hasta.strftime('%Y-%m-%d'))
+    data = obtener_datos_api(url, "MEP", estricto=estricto)
+    if not isinstance(data, list) or len(data) < 2: return pd.DataFrame()
+    df = pd.DataFrame(data[1:], columns=MEP_COLUMNS)
+    df['DOLAR MEP'] = pd.to_numeric(df['DOLAR MEP'].astype(str).str.replace(',', '.', regex=False), errors='coerce')
+    return normalizar_formato_fecha(df, 'fecha', dayfirst=True).dropna(subset=['fecha'])
+
+@metricas.medida()
+def obtener_libre(desde: date, hasta: date, estricto: bool = False) -> pd.DataFrame:
+    url = AMBITO_LIBRE_URL_TMPL.format(desde=desde.strftime('%Y-%m-%d'), hasta=hasta.strftime('%Y-%m-%d'))
+    data = obtener_datos_api(url, "LIBRE", estricto=estricto)
+    if not isinstance(data, list) or len(data) < 2: return pd.DataFrame()
+    df = pd.DataFrame(data[1:], columns=LIBRE_COLUMNS)
+    for col in ['Compra', 'Venta']:
+        df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.', regex=False), errors='coerce')
+    return normalizar_formato_fecha(df, dayfirst=True).dropna(subset=['Fecha'])
+
+@metricas.medida()
+def obtener_uva(cache: CacheHTTP | None = None, estricto: bool = False) -> pd.DataFrame:
+    data = obtener_datos_api(UVA_URL, "UVA", cache, estricto)
+    if not isinstance(data, list): return pd.DataFrame()
+    df = pd.DataFrame(data)
+    df.rename(columns={'fecha': 'Fecha', 'valor': 'Valor'}, inplace=True)
+    return normalizar_formato_fecha(df, dayfirst=False).dropna(subset=['Fecha'])
+
+@metricas.medida()
+def obtener_cac(cache: CacheHTTP | None = None, estricto: bool = False) -> pd.DataFrame:
+    data = obtener_datos_api(CAC_URL, "CAC", cache, estricto)
+    if not isinstance(data, list): return pd.DataFrame()
+    df = pd.DataFrame(data)
+    df.rename(columns={'period': 'Periodo', 'general': 'General', 'materials': 'Materiales', 'labour_force': 'Mano de obra'}, inplace=True)
+    df = df[['Periodo', 'General', 'Materiales', 'Mano de obra']]
+    for col in ['General', 'Materiales', 'Mano de obra']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce')
+    df['Periodo'] = pd.to_datetime(df['Periodo']).dt.strftime('%Y-%m-%d')
+    return df.dropna(subset=['Periodo'])
+
+def url_series(ids: list[str], desde: date | None = None) -> str:
+    """Consulta a la API de series de tiempo de datos.gob.ar (una o varias series a la vez)."""
+    params = {'ids': ",".join(ids), 'limit': SERIES_LIMITE, 'metadata': 'none'}
+    if desde is not None:
+        params['start_date'] = desde.isoformat()
+    return f"{SERIES_API_URL}?{urlencode(params, safe=',')}"
+
+def obtener_series(ids: list[str], source_name: str, desde: date | None = None, cache: CacheHTTP | None = None, estricto: bool = False) -> pd.DataFrame:
+    """Observaciones desde `desde` (o toda la historia) con una columna 'Periodo' y una por id."""
+    data = obtener_datos_api(url_series(ids, desde), source_name, cache, estricto)
+    if not isinstance(data, dict) or 'data' not in data: return pd.DataFrame()
+    df = pd.DataFrame(data['data'], columns=['Periodo', *ids])
+    df['Periodo'] = a_datetime64(df['Periodo'])
+    return df.dropna(subset=['Periodo'])
+
+@metricas.medida()
+def obtener_smvym(desde: date | None = None, cache: CacheHTTP | None = None, estricto: bool = False) -> pd.DataFrame:
+    df = obtener_series([SMVYM_SERIE_ID], "SMVyM", desde, cache, estricto)
+    return df.rename(columns={SMVYM_SERIE_ID: 'Salario'})
+
+@metricas.medida()
+def obtener_ipc(desde: date | None = None, cache: CacheHTTP | None = None, estricto: bool = False) -> pd.DataFrame:
+    df = obtener_series([IPC_SERIE_ID], "IPC", desde, cache, estricto)
+    return df.rename(columns={'Periodo': 'Fecha', IPC_SERIE_ID: 'Valor'})
+
+# --- PIZARRA ROSARIO (GGSA) ---
+
+def _valores_pizarra(items: pd.Series, campo: str) -> np.ndarray:
+    valores = items.map(lambda d: d.get(campo) if isinstance(d, dict) else None)
+    return pd.to_numeric(valores, errors='coerce').fillna(0.0).to_numpy(dtype=float)
+
+@metricas.medida()
+def obtener_datos_rosario(fecha_desde: date, fecha_hasta: date, previo: pd.DataFrame = None, estricto: bool = False) -> pd.DataFrame:
+    """Descarga la pizarra entre ambas fechas y la completa día a día.
+
+    `previo` son las últimas filas ya guardadas: la anterior a `fecha_desde` se usa como punto
+    de partida para arrastrar valores (y marcas de estimativo) hacia los primeros días sin dato.
+    """
+    url = ROSARIO_URL_TMPL.format(desde=fecha_desde.strftime('%Y-%m-%d'), hasta=fecha_hasta.strftime('%Y-%m-%d'))
+    json_data = obtener_datos_api(url, "Pizarra Rosario (GGSA)", estricto=estricto)
+    
+    if not json_data or "pizarra" not in json_data or not json_data["pizarra"]:
+        return pd.DataFrame()
+
+    # Una fila por fecha, una columna por cereal con el dict {precio, estimativo}
+    pizarra = pd.DataFrame.from_dict(json_data["pizarra"], orient="index")
+    df = pd.DataFrame({"Fecha": pd.to_datetime(pizarra.index)})
+
+    # Se usa el precio si es > 0; si no, el estimativo (> 0) y se marca como tal
+    for api_key, excel_col in ROSARIO_MAP.items():
+        if api_key in pizarra.columns:
+            precio = _valores_pizarra(pizarra[api_key], "precio")
+            estimativo = _valores_pizarra(pizarra[api_key], "estimativo")
+        else:
+            precio = estimativo = np.zeros(len(pizarra))
+        es_estimativo = (precio <= 0) & (estimativo > 0)
+        df[excel_col] = np.where(precio > 0, precio, np.where(es_estimativo, estimativo, 0.0))
+        df[f"{excel_col}_is_est"] = es_estimativo
+
+    df = df[df["Fecha"] >= pd.Timestamp(fecha_desde)]
+
+    fecha_inicio_dt = pd.Timestamp(fecha_desde)
+    if previo is not None and not previo.empty:
+        semilla = previo[pd.to_datetime(previo["Fecha"]) < fecha_inicio_dt].tail(1).copy()
+        if not semilla.empty:
+            semilla["Fecha"] = pd.to_datetime(semilla["Fecha"])
+            fecha_inicio_dt = semilla["Fecha"].iloc[0]
+            df = pd.concat([semilla, df], ignore_index=True)
+
+    try:
+        rango_fechas = pd.date_range(start=fecha_inicio_dt, end=pd.Timestamp(fecha_hasta), freq='D')
+        
+        df = df.drop_duplicates(subset="Fecha", keep="last").set_index("Fecha")
+        df = df.reindex(rango_fechas)
+        df = df.ffill()
+        df = df.reset_index().rename(columns={"index": "Fecha"})
+        df = df.fillna(0)
+    except Exception as e:
+        reporte.warning(f"⚠️ Advertencia procesando relleno fechas Rosario: {e}")
+
+    df = df[df["Fecha"] >= pd.Timestamp(fecha_desde)]
+    df["Fecha"] = a_datetime64(df["Fecha"])
+    
+    return df.sort_values("Fecha").reset_index(drop=True)
@@ -0,0 +1,115 @@
+"""Nombres, columnas, claves y formatos de las hojas del Excel."""
+
+# Configuración de Hojas y Columnas
+EXCEL_SHEET = "Divisa-Billete"
+EXCEL_COLUMNS = ['Fecha', 'Billete Compra', 'Billete Venta', 'Divisa Compra', 'Divisa Venta']
+
+MEP_SHEET = "MEP"
+MEP_COLUMNS = ['fecha', 'DOLAR MEP']
+
+LIBRE_SHEET = "Libre"
+LIBRE_COLUMNS = ['Fecha', 'Compra', 'Venta']
+
+UVA_SHEET = "UVA"
+UVA_COLUMNS = ["Fecha", "Valor"]
+
+CAC_SHEET = "CAC"
+CAC_COLUMNS = ["Periodo", "General", "Materiales", "Mano de obra"]
+
+SMVYM_SHEET = "SMVYM"
+SMVYM_COLUMNS = ["Periodo", "Salario"]
+
+IPC_SHEET = "IPC"
+IPC_COLUMNS = ["Fecha", "Valor"]
+
+# Períodos ya guardados de las series mensuales (SMVyM, IPC) que se vuelven a pedir,
+# por si el organismo revisó los últimos valores publicados
+SERIES_SOLAPAMIENTO_MESES = 3
+
+ROSARIO_SHEET = "Pizarra Rosario"
+ROSARIO_START_DATE = "2024-01-01"
+# Días ya guardados que se vuelven a pedir, para captar estimativos que pasaron a precio firme
+ROSARIO_SOLAPAMIENTO_DIAS = 7
+ROSARIO_COLOR_ESTIMATIVO = "BDD7EE"
+ROSARIO_COLUMNS_ORDER = ["Fecha", "Trigo", "Maíz", "Sorgo", "Girasol", "Soja"]
+ROSARIO_MAP = {
+    "trigo": "Trigo",
+    "maiz": "Maíz",
+    "sorgo": "Sorgo",
+    "girasol": "Girasol",
+    "soja": "Soja"
+}
+# Las marcas de estimativo se guardan en columnas ocultas a la derecha (G:K) y una única
+# regla de formato condicional pinta de celeste los valores B:F cuya marca es VERDADERO
+ROSARIO_FLAG_COLUMNS = [f"{col} estimativo" for col in ROSARIO_MAP.values()]
+ROSARIO_ESTILO_VALOR = "Pizarra Rosario - valor"
+
+# Hoja derivada (ver cotizaciones/indicadores.py): una fila por fecha de Divisa-Billete, con el
+# oficial (Billete Venta), la brecha y las variaciones del MEP y el libre, el oficial medido en UVA
+# y el oficial a precios de la base del IPC (diciembre 2016 = 100)
+INDICADORES_SHEET = "Indicadores"
+INDICADORES_COTIZACIONES = ["Oficial", "MEP", "Libre"]
+INDICADORES_COLUMNS = (
+    ["Fecha"] + INDICADORES_COTIZACIONES + ["Brecha MEP", "Brecha Libre"]
+    + [f"Var. diaria {col}" for col in INDICADORES_COTIZACIONES]
+    + [f"Var. mensual {col}" for col in INDICADORES_COTIZACIONES]
+    + ["Oficial en UVA", "Oficial real (IPC)"]
+)
+
+# Columna clave y formatos numéricos de cada hoja (Rosario tiene su propio estilo)
+CLAVE_POR_HOJA = {
+    EXCEL_SHEET: 'Fecha',
+    MEP_SHEET: 'fecha',
+    LIBRE_SHEET: 'Fecha',
+    UVA_SHEET: 'Fecha',
+    CAC_SHEET: 'Periodo',
+    SMVYM_SHEET: 'Periodo',
+    IPC_SHEET: 'Fecha',
+    ROSARIO_SHEET: 'Fecha',
+    INDICADORES_SHEET: 'Fecha',
+}
+FORMATOS_POR_HOJA = {
+    EXCEL_SHEET: {col: '#,##0.00' for col in EXCEL_COLUMNS[1:]},
+    MEP_SHEET: {'DOLAR MEP': '#,##0.00'},
+    LIBRE_SHEET: {'Compra': '#,##0.00', 'Venta': '#,##0.00'},
+    UVA_SHEET: {'Valor': '#,##0.00'},
+    CAC_SHEET: {'General': '#,##0.00', 'Materiales': '#,##0.00', 'Mano de obra': '#,##0.00'},
+    SMVYM_SHEET: {'Salario': '#,##0.00'},
+    IPC_SHEET: {'Valor': '#,##0.00'},
+    INDICADORES_SHEET: {
+        **{col: '#,##0.00' for col in INDICADORES_COTIZACIONES + ["Oficial real (IPC)"]},
+        **{col: '0.00%' for col in INDICADORES_COLUMNS if col.startswith(("Brecha", "Var."))},
+        "Oficial en UVA": '#,##0.0000',
+    },
+}
+
+# Tipo de cada columna de las series en memoria y en el almacén local (ver series.aplicar_esquema).
+# Las fechas van en datetime64[ns]; el período de CAC queda como texto 'aaaa-mm-dd', igual que en la hoja.
+# Los valores quedan en float64: float32 solo garantiza 7 dígitos y ya no representa exacto un
+# precio como 312500.50 de la pizarra, y centavos enteros obligarían a convertir de nuevo al
+# escribir el Excel. Las marcas de estimativo son bool (1 byte); empaquetarlas en bits no ahorra
+# nada apreciable con unos miles de filas y complica filtrar por ellas.
+_NUMERO = 'float64'
+ESQUEMA_POR_HOJA = {
+    EXCEL_SHEET: {'Fecha': 'datetime64[ns]', **{col: _NUMERO for col in EXCEL_COLUMNS[1:]}},
+    MEP_SHEET: {'fecha': 'datetime64[ns]', 'DOLAR MEP': _NUMERO},
+    LIBRE_SHEET: {'Fecha': 'datetime64[ns]', 'Compra': _NUMERO, 'Venta': _NUMERO},
+    UVA_SHEET: {'Fecha': 'datetime64[ns]', 'Valor': _NUMERO},
+    CAC_SHEET: {'Periodo': 'str', **{col: _NUMERO for col in CAC_COLUMNS[1:]}},
+    SMVYM_SHEET: {'Periodo': 'datetime64[ns]', 'Salario': _NUMERO},
+    IPC_SHEET: {'Fecha': 'datetime64[ns]', 'Valor': _NUMERO},
+    ROSARIO_SHEET: {
+        'Fecha': 'datetime64[ns]',
+        **{col: _NUMERO for col in ROSARIO_MAP.values()},
+        **{f"{col}_is_est": 'bool' for col in ROSARIO_MAP.values()},
+    },
+    INDICADORES_SHEET: {'Fecha': 'datetime64[ns]', **{col: _NUMERO for col in INDICADORES_COLUMNS[1:]}},
+}
+
+# Hojas diarias en las que se rellenan los días sin cotización
+HOJAS_CON_RELLENO = [EXCEL_SHEET, MEP_SHEET, LIBRE_SHEET]
+
+HOJAS_NECESARIAS = [
+    EXCEL_SHEET, MEP_SHEET, LIBRE_SHEET, UVA_SHEET,
+    CAC_SHEET, SMVYM_SHEET, IPC_SHEET, ROSARIO_SHEET, INDICADORES_SHEET
+]
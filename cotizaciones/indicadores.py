@@ -0,0 +1,110 @@
+"""Hoja "Indicadores": brecha, variaciones y valores ajustados, ya calculados.
+
+Reemplaza las fórmulas que se armaban a mano sobre las hojas de cotizaciones (y que Excel
+recalculaba en cada apertura). Se arma con pandas a partir de las series del almacén local
+de Divisa-Billete, MEP, Libre, UVA e IPC, unidas por fecha.
+
+En cada corrida se recalculan solo las filas desde la primera fecha que cambió en alguna de
+esas hojas (ver SesionLibro.cambios) o desde la última fila calculada, lo que sea anterior.
+Las variaciones de esas filas usan la cotización del día anterior y la de un mes antes, que
+se toman de la serie aunque no se recalculen.
+"""
+import pandas as pd
+
+from cotizaciones import metricas
+from cotizaciones.hojas import (
+    EXCEL_SHEET, MEP_SHEET, LIBRE_SHEET, UVA_SHEET, IPC_SHEET,
+    INDICADORES_SHEET, INDICADORES_COTIZACIONES, INDICADORES_COLUMNS, CLAVE_POR_HOJA, FORMATOS_POR_HOJA,
+)
+from cotizaciones.libro import SesionLibro, leer_serie_guardada
+from cotizaciones.reporte import reporte
+from cotizaciones.series import aplicar_esquema
+
+# Hojas de las que depende cada fila de la hoja de indicadores
+HOJAS_BASE = [EXCEL_SHEET, MEP_SHEET, LIBRE_SHEET, UVA_SHEET, IPC_SHEET]
+
+
+def _serie(df: pd.DataFrame, sheet_name: str, columna: str) -> pd.Series:
+    """Una columna de la serie indexada por su fecha, ordenada y sin fechas repetidas ni vacías."""
+    clave = CLAVE_POR_HOJA[sheet_name]
+    if df.empty or columna not in df.columns:
+        return pd.Series(dtype='float64', index=pd.DatetimeIndex([], dtype='datetime64[ns]'))
+    serie = df.set_index(clave)[columna].dropna().sort_index()
+    return serie[~serie.index.duplicated(keep='last')]
+
+def calcular_indicadores(series: dict[str, pd.DataFrame], desde: pd.Timestamp | None = None) -> pd.DataFrame:
+    """Filas de la hoja de indicadores para las fechas de Divisa-Billete >= `desde` (todas si es None).
+
+    `series` tiene una serie por hoja de HOJAS_BASE, con los tipos de ESQUEMA_POR_HOJA.
+    """
+    oficial = _serie(series[EXCEL_SHEET], EXCEL_SHEET, "Billete Venta")
+    fechas = oficial.index
+    inicio = 0 if desde is None else fechas.searchsorted(desde)
+    if inicio >= len(fechas):
+        return aplicar_esquema(pd.DataFrame(columns=INDICADORES_COLUMNS), INDICADORES_SHEET)
+
+    # Se incluyen la fecha anterior a `desde` y la de un mes antes, para las variaciones
+    contexto = 0
+    if inicio > 0:
+        hace_un_mes = fechas.searchsorted(fechas[inicio] - pd.DateOffset(months=1), side='right') - 1
+        contexto = max(0, min(inicio - 1, hace_un_mes))
+    fechas = fechas[contexto:]
+
+    precios = pd.DataFrame({
+        "Oficial": oficial.iloc[contexto:],
+        "MEP": _serie(series[MEP_SHEET], MEP_SHEET, "DOLAR MEP").reindex(fechas),
+        "Libre": _serie(series[LIBRE_SHEET], LIBRE_SHEET, "Venta").reindex(fechas),
+    }, index=fechas)
+    diaria = precios / precios.shift(1) - 1
+    mensual = precios / precios.reindex(fechas - pd.DateOffset(months=1), method='ffill').to_numpy() - 1
+
+    uva = _serie(series[UVA_SHEET], UVA_SHEET, "Valor").reindex(fechas, method='ffill')
+    # El IPC es mensual (fecha = primer día del mes): sin el índice del mes, la fila queda vacía
+    meses = fechas.to_period('M').to_timestamp().as_unit('ns')
+    ipc = _serie(series[IPC_SHEET], IPC_SHEET, "Valor").reindex(meses).to_numpy()
+
+    indicadores = pd.DataFrame({
+        "Fecha": fechas,
+        **{col: precios[col] for col in INDICADORES_COTIZACIONES},
+        "Brecha MEP": precios["MEP"] / precios["Oficial"] - 1,
+        "Brecha Libre": precios["Libre"] / precios["Oficial"] - 1,
+        **{f"Var. diaria {col}": diaria[col] for col in INDICADORES_COTIZACIONES},
+        **{f"Var. mensual {col}": mensual[col] for col in INDICADORES_COTIZACIONES},
+        "Oficial en UVA": precios["Oficial"] / uva,
+        "Oficial real (IPC)": precios["Oficial"] / ipc * 100,
+    }, index=fechas)
+    return aplicar_esquema(indicadores.iloc[inicio - contexto:].reset_index(drop=True), INDICADORES_SHEET)
+
+def _desde(libro: SesionLibro, previos: pd.DataFrame) -> pd.Timestamp | None:
+    """Primera fecha a recalcular: la primera que cambió en las hojas base o la siguiente a la última calculada."""
+    if previos.empty:
+        return None
+    candidatas = [pd.Timestamp(libro.cambios[hoja]) for hoja in HOJAS_BASE if hoja in libro.cambios]
+    candidatas.append(previos["Fecha"].max() + pd.Timedelta(days=1))
+    return min(candidatas)
+
+def actualizar_indicadores(libro: SesionLibro) -> bool:
+    """Recalcula las filas afectadas por lo que cambió en la sesión y las lleva a la hoja de indicadores."""
+    try:
+        with metricas.etapa("indicadores") as registro:
+            series = {hoja: leer_serie_guardada(libro, hoja, CLAVE_POR_HOJA[hoja]) for hoja in HOJAS_BASE}
+            if series[EXCEL_SHEET].empty:
+                return True
+            previos = leer_serie_guardada(libro, INDICADORES_SHEET, "Fecha")
+            desde = _desde(libro, previos)
+            nuevos = calcular_indicadores(series, desde)
+            registro["filas"] = len(nuevos)
+            if nuevos.empty:
+                return True
+
+            conservados = previos[previos["Fecha"] < desde] if desde is not None else previos.iloc[:0]
+            total = pd.concat([conservados, nuevos], ignore_index=True) if not conservados.empty else nuevos
+            if not libro.almacen.escribir(INDICADORES_SHEET, total):
+                return True
+            libro.fusionar_hoja(INDICADORES_SHEET, nuevos, total, "Fecha", FORMATOS_POR_HOJA[INDICADORES_SHEET])
+
+        reporte.success(f"📐 Hoja '{INDICADORES_SHEET}': {len(nuevos)} filas recalculadas.")
+        return True
+    except Exception as e:
+        reporte.error(f"❌ Error calculando la hoja '{INDICADORES_SHEET}': {e}")
+        return False
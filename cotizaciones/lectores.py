@@ -0,0 +1,72 @@
+"""Lectura de hojas completas del Excel, solo valores, con el motor elegido en config.json.
+
+Se usa cuando hace falta la historia que tiene una hoja y el libro todavía no se cargó
+(ej. la primera corrida, antes de que exista el almacén local): todas las hojas pedidas se
+leen en una sola pasada, sin estilos. Motores disponibles:
+
+- "openpyxl" (por defecto): openpyxl en modo read_only.
+- "calamine": python-calamine, bastante más rápido en libros grandes. Es opcional
+  (pip install python-calamine); si no está instalado se usa openpyxl.
+
+Para elegirlo, agregar a config.json: "lector_excel": "calamine"
+"""
+from datetime import date, datetime, time
+from pathlib import Path
+
+import openpyxl
+
+from cotizaciones import config
+from cotizaciones.reporte import reporte
+
+MOTOR_POR_DEFECTO = "openpyxl"
+
+
+def _leer_openpyxl(path: Path, hojas: list[str]) -> dict[str, list[tuple]]:
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        return {hoja: list(wb[hoja].iter_rows(values_only=True)) for hoja in hojas if hoja in wb.sheetnames}
+    finally:
+        wb.close()
+
+def _valor_calamine(valor):
+    # Las celdas vacías vienen como "" y las fechas sin hora como date: se llevan a lo que da openpyxl
+    if valor == "":
+        return None
+    if type(valor) is date:
+        return datetime.combine(valor, time())
+    return valor
+
+def _leer_calamine(path: Path, hojas: list[str]) -> dict[str, list[tuple]]:
+    from python_calamine import CalamineWorkbook
+
+    # Desde un archivo abierto por nosotros, así no queda ningún handle que impida reemplazar el Excel
+    with open(path, 'rb') as f:
+        wb = CalamineWorkbook.from_filelike(f)
+        filas = {}
+        for hoja in hojas:
+            if hoja in wb.sheet_names:
+                datos = wb.get_sheet_by_name(hoja).to_python(skip_empty_area=False)
+                filas[hoja] = [tuple(_valor_calamine(v) for v in fila) for fila in datos]
+        return filas
+
+MOTORES = {
+    "openpyxl": _leer_openpyxl,
+    "calamine": _leer_calamine,
+}
+
+
+def motor_configurado() -> str:
+    motor = config.cargar_config().get("lector_excel", MOTOR_POR_DEFECTO)
+    if motor not in MOTORES:
+        reporte.warning(f"⚠️ Lector de Excel '{motor}' desconocido, se usa {MOTOR_POR_DEFECTO}.")
+        return MOTOR_POR_DEFECTO
+    return motor
+
+def leer_hojas(path: Path, hojas: list[str], motor: str | None = None) -> dict[str, list[tuple]]:
+    """Filas (encabezado incluido) de cada hoja pedida que exista en el libro, en una sola pasada."""
+    motor = motor or motor_configurado()
+    try:
+        return MOTORES[motor](path, hojas)
+    except ImportError:
+        reporte.warning(f"⚠️ El lector '{motor}' no está instalado, se usa {MOTOR_POR_DEFECTO}.")
+        return MOTORES[MOTOR_POR_DEFECTO](path, hojas)
@@ -0,0 +1,735 @@
+"""Escritura del libro Excel: sesión única de carga/guardado, volcado de series y estilos."""
+import os
+import re
+import shutil
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import PatternFill, Font, Border, Side, Alignment, NamedStyle
+from openpyxl.utils import get_column_letter
+
+from cotizaciones import lectores, metadatos, metricas
+from cotizaciones.almacen import Almacen
+from cotizaciones.hojas import (
+    UVA_SHEET, SMVYM_SHEET, IPC_SHEET,
+    ROSARIO_SHEET, ROSARIO_SOLAPAMIENTO_DIAS, ROSARIO_COLOR_ESTIMATIVO,
+    ROSARIO_COLUMNS_ORDER, ROSARIO_MAP, ROSARIO_FLAG_COLUMNS, ROSARIO_ESTILO_VALOR, CLAVE_POR_HOJA,
+    FORMATOS_POR_HOJA, HOJAS_NECESARIAS, HOJAS_CON_RELLENO,
+)
+from cotizaciones.reporte import reporte
+from cotizaciones.series import aplicar_esquema, normalizar_formato_fecha, rellenar_fechas_faltantes
+
+
+def is_file_locked(filepath: Path) -> bool:
+    """Verifica si el archivo está abierto o bloqueado por otro proceso."""
+    if not filepath.exists():
+        return False
+    try:
+        # Intentamos abrir el archivo en modo 'append' (agregar)
+        with open(filepath, 'a'):
+            pass
+        return False
+    except IOError:
+        # Si lanza un error IOError / PermissionError, el archivo está bloqueado
+        return True
+
+def asegurar_hojas_existen(libro: "SesionLibro"):
+    """Verifica si las hojas necesarias existen en el Excel, y las crea si no están."""
+    try:
+        hojas = libro.marcas()
+        if all(hoja in hojas for hoja in HOJAS_NECESARIAS) and "Sheet" not in hojas:
+            return
+        wb = libro.wb
+        modificado = False
+        for hoja in HOJAS_NECESARIAS:
+            if hoja not in wb.sheetnames:
+                wb.create_sheet(hoja)
+                modificado = True
+        
+        # Opcional: Si el archivo es nuevo y tiene la hoja por defecto vacía, la eliminamos
+        if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
+            del wb["Sheet"]
+            modificado = True
+
+        if modificado:
+            libro.modificado = True
+            reporte.success("✅ Se verificaron y crearon las hojas faltantes en el Excel.")
+    except Exception as e:
+        reporte.error(f"❌ Error al verificar/crear hojas: {e}")
+
+
+# --- SESIÓN DE LIBRO EXCEL ---
+
+# Mismo estilo de encabezado que aplica pandas en DataFrame.to_excel
+_BORDE_FINO = Side(style='thin')
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=_BORDE_FINO, right=_BORDE_FINO, top=_BORDE_FINO, bottom=_BORDE_FINO)
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+FORMATO_FECHA = 'yyyy-mm-dd'
+
+class SesionLibro:
+    """Abre el libro una sola vez, aplica todos los cambios en memoria y lo guarda una sola vez.
+
+    Se usa como context manager: al salir sin errores guarda el archivo de forma atómica
+    (archivo temporal + renombrado) únicamente si alguna hoja fue modificada. El libro se
+    carga recién cuando hace falta leer o escribir una hoja, así una corrida sin cambios no
+    lo abre. `almacen` es el almacén columnar asociado al archivo, del que se exportan las
+    hojas; mientras el libro no se cargó, las hojas se leen con el lector rápido de
+    cotizaciones/lectores.py (una sola pasada por sesión). `cambios` guarda, por hoja, la
+    primera clave (ISO) cuyos valores cambiaron durante la sesión.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._wb = None
+        self._lectura = None
+        self.almacen = Almacen(path)
+        self.modificado = False
+        self.cambios: dict[str, str] = {}
+
+    def __enter__(self) -> "SesionLibro":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.modificado:
+            self.guardar()
+        if self._wb is not None:
+            self._wb.close()
+        return False
+
+    @property
+    def wb(self):
+        if self._wb is None:
+            self._wb = self._cargar()
+        return self._wb
+
+    def _cargar(self):
+        with metricas.etapa("cargar_libro"):
+            return openpyxl.load_workbook(self.path)
+
+    def marcas(self) -> dict:
+        """Última clave y cantidad de filas de cada hoja. Mientras el libro no se cargó, salen del
+        índice de metadatos si está al día con el archivo; si no, se carga el libro."""
+        if self._wb is None:
+            hojas = metadatos.cargar(self.path)
+            if hojas is not None:
+                return hojas
+        return metadatos.marcas_de_libro(self.wb)
+
+    def _leer_sin_cargar(self, sheet_name: str) -> list[tuple] | None:
+        """Filas de la hoja con el lector rápido. La primera vez se leen juntas todas las hojas que
+        todavía no tienen serie en el almacén (las que se van a pedir), y se reusan en la sesión."""
+        pendientes = []
+        if self._lectura is None:
+            self._lectura = {}
+            pendientes = [hoja for hoja in HOJAS_NECESARIAS if not self.almacen.existe(hoja)]
+        if sheet_name not in self._lectura:
+            hojas = list(dict.fromkeys([sheet_name] + pendientes))
+            with metricas.etapa("leer_hojas"):
+                leidas = lectores.leer_hojas(self.path, hojas)
+            self._lectura.update({hoja: leidas.get(hoja) for hoja in hojas})
+        return self._lectura[sheet_name]
+
+    def leer_hoja(self, sheet_name: str) -> pd.DataFrame:
+        """Equivalente en memoria a pd.read_excel(path, sheet_name=...)."""
+        if self._wb is None:
+            filas = self._leer_sin_cargar(sheet_name)
+        else:
+            # El libro cargado puede tener cambios que todavía no se guardaron
+            filas = list(self.wb[sheet_name].values) if sheet_name in self.wb.sheetnames else None
+        if filas is None:
+            raise KeyError(f"Hoja '{sheet_name}' inexistente")
+        if not filas or all(v is None for v in filas[0]):
+            return pd.DataFrame()
+        return pd.DataFrame(filas[1:], columns=list(filas[0]))
+
+    def reemplazar_hoja(self, sheet_name: str, df: pd.DataFrame, format_cols: dict = None):
+        """Reescribe la hoja con el contenido de df manteniendo su posición en el libro."""
+        wb = self.wb
+        if sheet_name in wb.sheetnames:
+            idx = wb.sheetnames.index(sheet_name)
+            del wb[sheet_name]
+            ws = wb.create_sheet(sheet_name, idx)
+        else:
+            ws = wb.create_sheet(sheet_name)
+
+        ws.append(list(df.columns))
+        for cell in ws[1]:
+            cell.font = HEADER_FONT
+            cell.border = HEADER_BORDER
+            cell.alignment = HEADER_ALIGNMENT
+
+        valores = df.astype(object).where(pd.notna(df), None)
+        for fila in valores.itertuples(index=False, name=None):
+            ws.append(fila)
+
+        ws.freeze_panes = 'A2'
+        for col_idx in range(1, len(df.columns) + 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = 12
+
+        for col_name, num_format in _formatos_de(df, format_cols).items():
+            if col_name in df.columns:
+                col_idx = df.columns.get_loc(col_name) + 1
+                for (cell,) in ws.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx):
+                    cell.number_format = num_format
+
+        self.modificado = True
+        metricas.sumar("filas_escritas", len(df), hoja=sheet_name)
+        return ws
+
+    def fusionar_hoja(self, sheet_name: str, df_cambios: pd.DataFrame, df_total: pd.DataFrame, key_column: str, format_cols: dict = None) -> str:
+        """Lleva a la hoja las filas de df_cambios (ya combinadas en df_total) tocando lo mínimo.
+
+        Las claves posteriores a la última de la hoja se agregan al final y las ya presentes se
+        actualizan celda por celda solo si cambiaron. La hoja se reescribe entera (df_total) si
+        cambió el encabezado o si alguna clave nueva cae en medio de la historia.
+        Devuelve el modo usado: "anexar", "actualizar" o "reemplazar".
+        """
+        ws = self.wb[sheet_name] if sheet_name in self.wb.sheetnames else None
+        columnas = list(df_total.columns)
+        claves = [metadatos.a_clave(v) for v in df_cambios[key_column]]
+        if ws is None or ws.max_row < 2 or [c.value for c in ws[1]] != columnas:
+            self._registrar_cambio(sheet_name, claves)
+            self.reemplazar_hoja(sheet_name, df_total, format_cols)
+            return "reemplazar"
+
+        marcas = metadatos.marcas_de_hoja(ws)
+        ultima = marcas["ultima_clave"]
+        if ultima is None or not all(_es_clave_iso(c) for c in claves + [ultima]):
+            self._registrar_cambio(sheet_name, claves)
+            self.reemplazar_hoja(sheet_name, df_total, format_cols)
+            return "reemplazar"
+
+        filas = _filas_desde_clave(ws, min(claves)) if claves and min(claves) <= ultima else {}
+        if any(c <= ultima and c not in filas for c in claves):
+            self._registrar_cambio(sheet_name, claves)
+            self.reemplazar_hoja(sheet_name, df_total, format_cols)
+            return "reemplazar"
+
+        formatos = {columnas.index(col) + 1: fmt for col, fmt in _formatos_de(df_total, format_cols).items() if col in columnas}
+        valores = df_cambios[columnas].astype(object).where(pd.notna(df_cambios[columnas]), None)
+        siguiente_fila = marcas["filas"] + 2
+        escritas = 0
+        for clave, fila in zip(claves, valores.itertuples(index=False, name=None)):
+            row_idx = filas.get(clave)
+            nueva = row_idx is None
+            if nueva:
+                row_idx = siguiente_fila
+                siguiente_fila += 1
+            cambio = False
+            for col_idx, valor in enumerate(fila, start=1):
+                cell = ws.cell(row=row_idx, column=col_idx)
+                if cell.value != valor:
+                    cell.value = valor
+                    cambio = True
+                if nueva and col_idx in formatos:
+                    cell.number_format = formatos[col_idx]
+            if cambio:
+                escritas += 1
+                self._registrar_cambio(sheet_name, [clave])
+        if escritas:
+            self.modificado = True
+            metricas.sumar("filas_escritas", escritas, hoja=sheet_name)
+        return "actualizar" if filas else "anexar"
+
+    def _registrar_cambio(self, sheet_name: str, claves: list[str]):
+        claves = [c for c in claves if c is not None]
+        if sheet_name in self.cambios:
+            claves.append(self.cambios[sheet_name])
+        if claves:
+            self.cambios[sheet_name] = min(claves)
+
+    def guardar(self):
+        """Guarda en un temporal de la misma carpeta y lo renombra sobre el original."""
+        with metricas.etapa("guardar_libro"):
+            _guardar_atomico(self.wb, self.path)
+        self.modificado = False
+
+        # Índice de últimas fechas por hoja, con el hash de la serie que recibió cada una (ver
+        # exportar_hojas_atrasadas); si no se puede escribir, la próxima corrida lee el Excel
+        marcas = metadatos.marcas_de_libro(self.wb)
+        for hoja, marca in marcas.items():
+            marca["hash"] = self.almacen.hash(hoja)
+        try:
+            metadatos.guardar(self.path, marcas)
+        except OSError:
+            pass
+
+
+def _guardar_atomico(wb, path: Path):
+    """Guarda el libro en un temporal de la misma carpeta y lo renombra sobre `path`."""
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.stem}.", suffix=".tmp", dir=path.parent)
+    os.close(fd)
+    try:
+        wb.save(tmp)
+        # mkstemp crea el temporal con permisos 0600: se conservan los del libro original
+        if path.exists():
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _formatos_de(df: pd.DataFrame, format_cols: dict = None) -> dict:
+    """Formato numérico por columna; las fechas en datetime64 se muestran sin hora, igual que las de tipo date."""
+    formatos = {col: FORMATO_FECHA for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])}
+    formatos.update(format_cols or {})
+    return formatos
+
+def _es_clave_iso(clave: str) -> bool:
+    return isinstance(clave, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", clave) is not None
+
+def _filas_desde_clave(ws, desde, clave_de=metadatos.a_clave) -> dict:
+    """Mapea clave -> número de fila para las filas finales de la hoja con clave >= desde.
+
+    `clave_de` convierte el valor de la columna A al tipo de `desde` (por defecto, clave ISO).
+    """
+    filas = {}
+    for row_idx in range(ws.max_row, 1, -1):
+        valor = ws.cell(row=row_idx, column=1).value
+        if valor is None:
+            continue
+        clave = clave_de(valor)
+        if clave < desde:
+            break
+        filas[clave] = row_idx
+    return filas
+
+
+# --- UTILIDADES PARA EXCEL ---
+
+DESCRIPCION_MODO = {
+    "anexar": "filas nuevas agregadas al final",
+    "actualizar": "filas revisadas actualizadas",
+    "reemplazar": "hoja reescrita",
+}
+
+def leer_ultimas_fechas(path: Path, hojas: list[str]) -> dict[str, date | None]:
+    """Última fecha guardada de cada hoja: del almacén local o, si la serie todavía no está ahí,
+    del índice del Excel (ver cotizaciones/metadatos.py). Nunca se leen las hojas completas."""
+    almacen = Almacen(path)
+    claves = {}
+    try:
+        for hoja in hojas:
+            if almacen.existe(hoja):
+                claves[hoja] = metadatos.a_clave(almacen.ultima_clave(hoja, CLAVE_POR_HOJA[hoja]))
+        faltantes = [hoja for hoja in hojas if hoja not in claves]
+        if faltantes:
+            claves.update(metadatos.leer_ultimas_claves(path, faltantes))
+    except Exception:
+        return {hoja: None for hoja in hojas}
+    fechas = {}
+    for hoja, clave in claves.items():
+        try:
+            fechas[hoja] = date.fromisoformat(clave) if clave else None
+        except ValueError:
+            # Fechas cargadas a mano como texto (dd/mm/aaaa)
+            fecha = pd.to_datetime(clave, dayfirst=True, errors='coerce')
+            fechas[hoja] = None if pd.isna(fecha) else fecha.date()
+    return fechas
+
+def leer_serie_guardada(libro: SesionLibro, sheet_name: str, key_column: str) -> pd.DataFrame:
+    """Serie completa desde el almacén local; la primera vez se toma lo que ya tiene la hoja del Excel."""
+    df = libro.almacen.leer(sheet_name)
+    if df is not None:
+        return aplicar_esquema(df, sheet_name)
+    try:
+        df = libro.leer_hoja(sheet_name)
+        if sheet_name in [SMVYM_SHEET, UVA_SHEET, IPC_SHEET]:
+            df = normalizar_formato_fecha(df, key_column, dayfirst=False)
+        else:
+            df = normalizar_formato_fecha(df, key_column, dayfirst=True)
+        return aplicar_esquema(df.dropna(subset=[key_column]), sheet_name)
+    except Exception:
+        return pd.DataFrame()
+
+@metricas.medida(etiqueta="sheet_name")
+def actualizar_hoja_excel(libro: SesionLibro, df_nuevo: pd.DataFrame, sheet_name: str, key_column: str, format_cols: dict = None, hoy: date | None = None) -> bool:
+    """Combina lo descargado con la serie del almacén local y lleva a la hoja solo lo nuevo.
+
+    Si todas las claves descargadas son posteriores a lo guardado, se agregan al final sin
+    reordenar ni deduplicar la historia; si se solapan, se combina todo y en la hoja se
+    actualizan únicamente las filas afectadas (ver SesionLibro.fusionar_hoja). Si el resultado
+    es idéntico a la serie guardada, no se escribe nada.
+
+    Con `hoy`, en las hojas de HOJAS_CON_RELLENO los días sin cotización (fines de semana,
+    feriados) se completan en memoria antes de volcar, así van a la hoja junto con las filas
+    descargadas en un único agregado al final. Hoy y ayer no se rellenan.
+    """
+    try:
+        df_existente = leer_serie_guardada(libro, sheet_name, key_column)
+        df_nuevo = aplicar_esquema(df_nuevo, sheet_name)
+
+        df_nuevo = df_nuevo.drop_duplicates(subset=[key_column], keep='last').sort_values(key_column)
+        df_total = pd.concat([df_existente, df_nuevo], ignore_index=True)
+        solo_agrega = key_column not in df_existente.columns or df_existente.empty or df_nuevo[key_column].min() > df_existente[key_column].max()
+        if not solo_agrega:
+            df_total = df_total.drop_duplicates(subset=[key_column], keep='last').sort_values(key_column)
+        if hoy is not None and sheet_name in HOJAS_CON_RELLENO and not df_total.empty:
+            df_total = rellenar_fechas_faltantes(df_total, key_column, [hoy, hoy - timedelta(days=1)]).reindex(columns=df_total.columns)
+
+        # Si lo descargado ya estaba guardado tal cual, no se toca la hoja (ni se carga el libro)
+        if not libro.almacen.escribir(sheet_name, df_total):
+            reporte.info(f"💤 Hoja '{sheet_name}' sin cambios.")
+            return True
+        # A la hoja van las filas descargadas y las que agregó el relleno
+        claves = df_total[key_column]
+        guardadas = df_existente[key_column] if key_column in df_existente.columns else []
+        df_cambios = df_total[claves.isin(df_nuevo[key_column]) | ~claves.isin(guardadas)]
+        modo = libro.fusionar_hoja(sheet_name, df_cambios, df_total, key_column, format_cols)
+
+        reporte.success(f"💾 Excel actualizado: hoja '{sheet_name}' ({DESCRIPCION_MODO[modo]}).")
+        return True
+    except Exception as e:
+        reporte.error(f"❌ Error actualizando hoja '{sheet_name}': {e}")
+        return False
+
+@metricas.medida(etiqueta="sheet_name")
+def post_process_and_fill_sheet(libro: SesionLibro, sheet_name: str, key_column: str, hoy: date) -> bool:
+    """Rellena los huecos que hayan quedado en la serie guardada (las hojas actualizadas en la
+    corrida ya llegan rellenadas desde actualizar_hoja_excel)."""
+    reporte.info(f"🔧 Post-Proceso: Rellenando fechas faltantes en hoja '{sheet_name}'...")
+    try:
+        if sheet_name == ROSARIO_SHEET:
+             return True
+        elif sheet_name not in HOJAS_CON_RELLENO:
+            return False
+        format_cols = FORMATOS_POR_HOJA[sheet_name]
+
+        df_sheet = leer_serie_guardada(libro, sheet_name, key_column)
+        ayer = hoy - timedelta(days=1)
+        df_filled = rellenar_fechas_faltantes(df_sheet, key_column, [hoy, ayer])
+        if df_filled.empty:
+            return True
+
+        # El relleno no modifica las fechas existentes: a la hoja solo van los días agregados
+        agregados = df_filled[~df_filled[key_column].isin(df_sheet[key_column])]
+        if agregados.empty:
+            return True
+        libro.almacen.escribir(sheet_name, df_filled)
+        libro.fusionar_hoja(sheet_name, agregados, df_filled, key_column, format_cols)
+            
+        reporte.success(f"✅ Hoja '{sheet_name}' rellenada.")
+        return True
+    except Exception as e:
+        reporte.error(f"❌ Error Post-Proceso '{sheet_name}': {e}")
+        return False
+
+@metricas.medida()
+def exportar_hojas_atrasadas(libro: SesionLibro):
+    """Vuelve a exportar las hojas que no recibieron la última versión de su serie del almacén
+    local (por ejemplo, si en una corrida anterior el Excel no se pudo guardar).
+
+    Se llama al abrir la sesión, antes de escribir nada en el almacén. Una hoja está atrasada si
+    el hash registrado en el índice de metadatos al guardar el libro no es el de la serie, lo que
+    incluye valores revisados sin fecha nueva, o si su último dato no coincide con el de la serie.
+    Sin índice al día (el Excel cambió por fuera) solo se compara el último dato.
+    """
+    marcas = libro.marcas()
+    for hoja in libro.almacen.series():
+        if hoja not in marcas or hoja not in CLAVE_POR_HOJA:
+            continue
+        clave_almacen = metadatos.a_clave(libro.almacen.ultima_clave(hoja, CLAVE_POR_HOJA[hoja]))
+        exportado = marcas[hoja].get("hash")
+        if (exportado is None or exportado == libro.almacen.hash(hoja)) and marcas[hoja]["ultima_clave"] == clave_almacen:
+            continue
+        reporte.info(f"♻️ La hoja '{hoja}' estaba desactualizada respecto de los datos locales: se vuelve a exportar.")
+        exportar_hoja(libro, hoja)
+
+def exportar_hoja(libro: SesionLibro, hoja: str):
+    """Reescribe una hoja completa a partir de su serie en el almacén local."""
+    df = libro.almacen.leer(hoja)
+    if df is None:
+        return
+    df = aplicar_esquema(df, hoja)
+    if hoja == ROSARIO_SHEET:
+        libro.reemplazar_hoja(hoja, pd.DataFrame(columns=ROSARIO_COLUMNS_ORDER + ROSARIO_FLAG_COLUMNS))
+        guardar_rosario_con_estilo(libro, df, forzar=True)
+    else:
+        libro.reemplazar_hoja(hoja, df, FORMATOS_POR_HOJA.get(hoja))
+
+
+# --- PIZARRA ROSARIO (GGSA) ---
+
+def _es_celda_estimativa(cell) -> bool:
+    """Formato anterior: la marca de estimativo estaba solo en el relleno de la celda."""
+    fill = cell.fill
+    return fill is not None and fill.fill_type == "solid" and str(fill.fgColor.rgb).upper().endswith(ROSARIO_COLOR_ESTIMATIVO)
+
+def _encabezado_rosario_valido(ws) -> bool:
+    encabezado = [cell.value for cell in ws[1]]
+    return encabezado[:len(ROSARIO_COLUMNS_ORDER)] == ROSARIO_COLUMNS_ORDER
+
+def _tiene_columnas_marca(ws) -> bool:
+    inicio = len(ROSARIO_COLUMNS_ORDER) + 1
+    encabezado = [ws.cell(row=1, column=inicio + i).value for i in range(len(ROSARIO_FLAG_COLUMNS))]
+    return encabezado == ROSARIO_FLAG_COLUMNS
+
+def leer_ultimo_estado_rosario(path: Path, dias: int = ROSARIO_SOLAPAMIENTO_DIAS) -> pd.DataFrame:
+    """Devuelve las últimas filas guardadas de la Pizarra Rosario, incluidas sus marcas de estimativo.
+
+    Se toman del almacén local o, si la serie todavía no está ahí, se leen en modo read_only
+    las últimas `dias + 1` filas de la hoja. Si la hoja está vacía,
+    no tiene el formato esperado o todavía no tiene las columnas de marca, se devuelve un DataFrame
+    vacío y se descarga todo desde ROSARIO_START_DATE.
+    """
+    try:
+        almacen = Almacen(path)
+        if almacen.existe(ROSARIO_SHEET):
+            return aplicar_esquema(almacen.ultimas_filas(ROSARIO_SHEET, dias + 1), ROSARIO_SHEET)
+        encabezado, filas = metadatos.leer_ultimas_filas(path, ROSARIO_SHEET, dias + 1)
+    except Exception:
+        return pd.DataFrame()
+    n_valores = len(ROSARIO_COLUMNS_ORDER)
+    if encabezado[:n_valores] != ROSARIO_COLUMNS_ORDER or encabezado[n_valores:n_valores + len(ROSARIO_FLAG_COLUMNS)] != ROSARIO_FLAG_COLUMNS:
+        return pd.DataFrame()
+
+    registros = []
+    for fila in filas:
+        fila = list(fila) + [None] * (n_valores + len(ROSARIO_FLAG_COLUMNS) - len(fila))
+        registro = {"Fecha": pd.Timestamp(fila[0])}
+        for i, col in enumerate(ROSARIO_COLUMNS_ORDER[1:]):
+            registro[col] = fila[1 + i] or 0.0
+            registro[f"{col}_is_est"] = bool(fila[n_valores + i])
+        registros.append(registro)
+    return aplicar_esquema(pd.DataFrame(registros), ROSARIO_SHEET)
+
+def _preparar_estilos_rosario(libro: SesionLibro, ws):
+    """Registra el estilo con nombre de los valores y la regla de formato condicional (una sola vez)."""
+    if ROSARIO_ESTILO_VALOR not in libro.wb.named_styles:
+        libro.wb.add_named_style(NamedStyle(name=ROSARIO_ESTILO_VALOR, number_format='#,##0.00'))
+
+    n_valores = len(ROSARIO_COLUMNS_ORDER)
+    for i, nombre in enumerate(ROSARIO_FLAG_COLUMNS):
+        letra = get_column_letter(n_valores + 1 + i)
+        ws.cell(row=1, column=n_valores + 1 + i, value=nombre)
+        ws.column_dimensions[letra].hidden = True
+
+    rango, regla = _regla_estimativos_rosario()
+    if not any(str(cf.sqref) == rango for cf in ws.conditional_formatting):
+        ws.conditional_formatting.add(rango, regla)
+
+def _regla_estimativos_rosario() -> tuple[str, FormulaRule]:
+    """Rango y regla de formato condicional que pinta de celeste los valores marcados como estimativos."""
+    n_valores = len(ROSARIO_COLUMNS_ORDER)
+    primera_marca = get_column_letter(n_valores + 1)
+    # Referencia relativa: B2 mira G2, C2 mira H2, ... y así para toda la columna
+    rango = f"B2:{get_column_letter(n_valores)}1048576"
+    fill_celeste = PatternFill(start_color=ROSARIO_COLOR_ESTIMATIVO, end_color=ROSARIO_COLOR_ESTIMATIVO, fill_type="solid")
+    return rango, FormulaRule(formula=[f"{primera_marca}2=TRUE"], fill=fill_celeste)
+
+def _migrar_marcas_rosario(ws):
+    """Pasa las marcas de estimativo del formato anterior (relleno por celda) a las columnas ocultas."""
+    n_valores = len(ROSARIO_COLUMNS_ORDER)
+    for fila in ws.iter_rows(min_row=2, max_col=n_valores):
+        if fila[0].value is None:
+            continue
+        for i, cell in enumerate(fila[1:]):
+            ws.cell(row=cell.row, column=n_valores + 1 + i, value=_es_celda_estimativa(cell))
+
+def _hoja_rosario_lista(libro: SesionLibro):
+    """La hoja con encabezado válido, columnas de marca y estilos (la crea o migra si hace falta)."""
+    ws = libro.wb[ROSARIO_SHEET] if ROSARIO_SHEET in libro.wb.sheetnames else None
+    if ws is None or ws.max_row < 2 or not _encabezado_rosario_valido(ws):
+        # Hoja nueva o con otro formato: se recrea solo con el encabezado
+        ws = libro.reemplazar_hoja(ROSARIO_SHEET, pd.DataFrame(columns=ROSARIO_COLUMNS_ORDER + ROSARIO_FLAG_COLUMNS))
+    elif not _tiene_columnas_marca(ws):
+        _migrar_marcas_rosario(ws)
+    _preparar_estilos_rosario(libro, ws)
+    return ws
+
+def _serie_rosario_desde_hoja(libro: SesionLibro) -> pd.DataFrame:
+    """Lee la hoja (ya con columnas de marca) con los nombres de columna del almacén."""
+    df = libro.leer_hoja(ROSARIO_SHEET)
+    df = df.rename(columns={flag: f"{col}_is_est" for flag, col in zip(ROSARIO_FLAG_COLUMNS, ROSARIO_MAP.values())})
+    if df.empty:
+        return df
+    df = normalizar_formato_fecha(df, "Fecha").dropna(subset=["Fecha"])
+    for col in ROSARIO_MAP.values():
+        df[f"{col}_is_est"] = df[f"{col}_is_est"].fillna(False).astype(bool)
+    return df
+
+@metricas.medida()
+def guardar_rosario_con_estilo(libro: SesionLibro, df: pd.DataFrame, forzar: bool = False) -> bool:
+    """Combina las filas con la serie del almacén local y las vuelca a la hoja.
+
+    En la hoja se agregan las filas nuevas al final y se reescriben solo las ya existentes que se
+    volvieron a pedir. Las marcas de estimativo se calculan por columna y se escriben en las columnas
+    ocultas; el celeste lo aplica una única regla de formato condicional, así que no hay rellenos por celda.
+    Si las filas no cambian nada de lo guardado no se toca la hoja, salvo con `forzar` (al exportarla de nuevo).
+    """
+    sheet_name = ROSARIO_SHEET
+    reporte.info(f"🎨 Guardando y aplicando estilos en hoja '{sheet_name}'...")
+    
+    try:
+        cols_valores = ["Fecha"] + list(ROSARIO_MAP.values())
+        cols_marca = [f"{col}_is_est" for col in ROSARIO_MAP.values()]
+        
+        for col in cols_valores:
+             if col not in df.columns: df[col] = 0
+        for col in cols_marca:
+             if col not in df.columns: df[col] = False
+        
+        df = aplicar_esquema(df, sheet_name).sort_values("Fecha").reset_index(drop=True)
+
+        almacen = libro.almacen
+        if almacen.existe(sheet_name):
+            df_existente = aplicar_esquema(almacen.leer(sheet_name), sheet_name)
+        else:
+            _hoja_rosario_lista(libro)
+            df_existente = aplicar_esquema(_serie_rosario_desde_hoja(libro), sheet_name)
+        # Solo las columnas del esquema (versiones anteriores podían arrastrar las de la hoja)
+        df_total = pd.concat([df_existente, df[cols_valores + cols_marca]], ignore_index=True).reindex(columns=cols_valores + cols_marca)
+        df_total = df_total.drop_duplicates(subset=["Fecha"], keep="last").sort_values("Fecha")
+        if not almacen.escribir(sheet_name, df_total) and not forzar:
+            reporte.info(f"💤 Hoja '{sheet_name}' sin cambios.")
+            return True
+        ws = _hoja_rosario_lista(libro)
+
+        # En la hoja la fecha va sin hora, como la escribieron siempre las versiones anteriores
+        fechas = df["Fecha"].dt.date.tolist()
+        filas_existentes = _filas_desde_clave(ws, fechas[0], lambda valor: pd.Timestamp(valor).date())
+        ultima_en_hoja = ws.cell(row=ws.max_row, column=1).value if ws.max_row >= 2 else None
+        if ultima_en_hoja is not None and any(
+            fecha not in filas_existentes and fecha < pd.Timestamp(ultima_en_hoja).date() for fecha in fechas
+        ):
+            # Fechas anteriores a la historia de la hoja (ej. un backfill): se reescribe completa en orden
+            ws = libro.reemplazar_hoja(sheet_name, pd.DataFrame(columns=cols_valores + ROSARIO_FLAG_COLUMNS))
+            _preparar_estilos_rosario(libro, ws)
+            df = df_total.reset_index(drop=True)
+            fechas = df["Fecha"].dt.date.tolist()
+            filas_existentes = {}
+
+        valores = df[cols_valores[1:]].to_numpy(dtype=float)
+        marcas = df[cols_marca].to_numpy(dtype=bool)
+        siguiente_fila = ws.max_row + 1
+        nuevas = revisadas = 0
+        
+        for fecha, fila_valores, fila_marcas in zip(fechas, valores.tolist(), marcas.tolist()):
+            excel_row = filas_existentes.get(fecha)
+            if excel_row is None:
+                excel_row = siguiente_fila
+                siguiente_fila += 1
+                nuevas += 1
+            else:
+                revisadas += 1
+            ws.cell(row=excel_row, column=1, value=fecha)
+            for i, valor in enumerate(fila_valores):
+                ws.cell(row=excel_row, column=2 + i, value=valor).style = ROSARIO_ESTILO_VALOR
+            for i, marca in enumerate(fila_marcas):
+                ws.cell(row=excel_row, column=len(cols_valores) + 1 + i, value=marca)
+
+        libro.modificado = True
+        metricas.sumar("filas_escritas", nuevas + revisadas, hoja=sheet_name)
+        reporte.success(f"✅ Hoja '{sheet_name}': {nuevas} filas nuevas y {revisadas} revisadas ({int(marcas.sum())} valores estimativos en celeste).")
+        return True
+
+    except Exception as e:
+        reporte.error(f"❌ Error guardando hoja Rosario: {e}")
+        return False
+
+
+# --- EXPORTACIÓN COMPLETA (STREAMING) ---
+
+def _celda(ws, valor, estilo: dict) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=valor)
+    for atributo, v in estilo.items():
+        setattr(cell, atributo, v)
+    return cell
+
+def _volcar_en_streaming(ws, df: pd.DataFrame, estilos: dict[str, dict], ocultas: list[str] = ()) -> dict:
+    """Escribe encabezado y filas en una hoja write_only, con el mismo aspecto que reemplazar_hoja.
+
+    `estilos` da, por columna, los atributos de estilo de sus celdas (formato numérico o estilo
+    con nombre, compartidos por toda la columna). Devuelve las marcas de la hoja para el índice de metadatos.
+    """
+    # En modo write_only las columnas y el panel fijo se definen antes de la primera fila
+    ws.freeze_panes = 'A2'
+    for col_idx, col_name in enumerate(df.columns, start=1):
+        dimension = ws.column_dimensions[get_column_letter(col_idx)]
+        dimension.width = 12
+        dimension.hidden = col_name in ocultas
+
+    encabezado = {"font": HEADER_FONT, "border": HEADER_BORDER, "alignment": HEADER_ALIGNMENT}
+    ws.append([_celda(ws, col_name, encabezado) for col_name in df.columns])
+    por_columna = [estilos.get(col_name) for col_name in df.columns]
+    valores = df.astype(object).where(pd.notna(df), None)
+    for fila in valores.itertuples(index=False, name=None):
+        ws.append([_celda(ws, valor, estilo) if estilo else valor for valor, estilo in zip(fila, por_columna)])
+
+    if df.empty:
+        return {"ultima_clave": None, "filas": 0}
+    return {"ultima_clave": metadatos.a_clave(valores.iat[-1, 0]), "filas": len(df)}
+
+def _hoja_rosario_para_exportar(df: pd.DataFrame) -> pd.DataFrame:
+    """La serie del almacén con las columnas y tipos de la hoja: fecha sin hora y marcas con su nombre visible."""
+    hoja = pd.DataFrame({"Fecha": df["Fecha"].dt.date})
+    for col in ROSARIO_COLUMNS_ORDER[1:]:
+        hoja[col] = df[col].astype(float)
+    for flag, col in zip(ROSARIO_FLAG_COLUMNS, ROSARIO_MAP.values()):
+        hoja[flag] = df[f"{col}_is_est"].astype(bool)
+    return hoja
+
+def _hojas_del_libro(path: Path) -> dict[str, str | None]:
+    """Hojas del libro, en orden, con su última clave (None si están vacías)."""
+    marcas = metadatos.cargar(path)
+    if marcas is not None:
+        return {hoja: marca["ultima_clave"] for hoja, marca in marcas.items()}
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        nombres = wb.sheetnames
+    finally:
+        wb.close()
+    return metadatos.leer_ultimas_claves(path, nombres)
+
+def exportar_libro_completo(path: Path) -> bool:
+    """Reescribe el libro entero desde el almacén local en una sola pasada, con openpyxl en modo write_only.
+
+    Las filas se emiten a medida que se escriben, así que la memoria no crece con la historia como
+    al cargar el libro y reemplazar hoja por hoja. Solo es posible si el libro no tiene nada que no
+    salga del almacén (hojas agregadas a mano, o hojas propias con datos pero sin serie guardada):
+    en ese caso devuelve False sin tocar el archivo y hay que exportar sobre el libro cargado (ver exportar_hoja).
+    """
+    almacen = Almacen(path)
+    hojas = _hojas_del_libro(path)
+    # La hoja por defecto de un libro nuevo se descarta, como en asegurar_hojas_existen
+    ajenas = [hoja for hoja in hojas if hoja not in HOJAS_NECESARIAS and hoja != "Sheet"]
+    if ajenas or any(ultima is not None and not almacen.existe(hoja) for hoja, ultima in hojas.items() if hoja in HOJAS_NECESARIAS):
+        return False
+    orden = [hoja for hoja in hojas if hoja in HOJAS_NECESARIAS] + [hoja for hoja in HOJAS_NECESARIAS if hoja not in hojas]
+
+    with metricas.etapa("exportar_libro"):
+        wb = openpyxl.Workbook(write_only=True)
+        wb.add_named_style(NamedStyle(name=ROSARIO_ESTILO_VALOR, number_format='#,##0.00'))
+        marcas = {}
+        for hoja in orden:
+            ws = wb.create_sheet(hoja)
+            df = almacen.leer(hoja)
+            if df is None:
+                marcas[hoja] = {"ultima_clave": None, "filas": 0}
+                continue
+            hash_serie = almacen.hash(hoja)
+            df = aplicar_esquema(df, hoja)
+            if hoja == ROSARIO_SHEET:
+                df = _hoja_rosario_para_exportar(df)
+                estilos = {col: {"style": ROSARIO_ESTILO_VALOR} for col in ROSARIO_COLUMNS_ORDER[1:]}
+                marcas[hoja] = _volcar_en_streaming(ws, df, estilos, ocultas=ROSARIO_FLAG_COLUMNS)
+                ws.conditional_formatting.add(*_regla_estimativos_rosario())
+            else:
+                estilos = {col: {"number_format": fmt} for col, fmt in _formatos_de(df, FORMATOS_POR_HOJA.get(hoja)).items() if col in df.columns}
+                marcas[hoja] = _volcar_en_streaming(ws, df, estilos)
+            marcas[hoja]["hash"] = hash_serie
+            metricas.sumar("filas_escritas", len(df), hoja=hoja)
+        _guardar_atomico(wb, path)
+
+    try:
+        metadatos.guardar(path, marcas)
+    except OSError:
+        pass
+    return True
@@ -0,0 +1,117 @@
+"""Índice de la última clave (fecha/periodo) guardada en cada hoja del libro.
+
+Se mantiene en un archivo JSON junto al Excel que se reescribe cada vez que el
+actualizador guarda el libro. Si el Excel cambió por fuera (su tamaño o fecha de
+modificación no coinciden con los registrados) se recurre a leer solo las últimas
+filas de cada hoja con openpyxl en modo read_only. Cada hoja exportada desde el almacén
+local lleva además el hash de la serie que recibió (ver libro.exportar_hojas_atrasadas).
+"""
+import json
+import os
+from collections import deque
+from datetime import date, datetime
+from pathlib import Path
+
+VERSION = 1
+
+
+def ruta_metadatos(excel_path: Path) -> Path:
+    return excel_path.with_name(f"{excel_path.stem}.meta.json")
+
+
+def _firma(excel_path: Path) -> dict:
+    stat = excel_path.stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def a_clave(valor):
+    """Normaliza el valor de la columna clave a un string serializable (ISO para fechas)."""
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if valor is None:
+        return None
+    return str(valor)
+
+
+def cargar(excel_path: Path) -> dict | None:
+    """Devuelve {hoja: {"ultima_clave", "filas", "hash"}} o None si no hay metadatos válidos para el archivo."""
+    ruta = ruta_metadatos(excel_path)
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != VERSION or meta.get("firma") != _firma(excel_path):
+            return None
+        return meta.get("hojas", {})
+    except (OSError, ValueError):
+        return None
+
+
+def guardar(excel_path: Path, hojas: dict):
+    """Escribe los metadatos firmados con el estado actual del Excel (llamar justo después de guardarlo)."""
+    ruta = ruta_metadatos(excel_path)
+    meta = {"version": VERSION, "firma": _firma(excel_path), "hojas": hojas}
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+
+def marcas_de_hoja(ws) -> dict:
+    """Última clave (columna A) y cantidad de filas de datos de una hoja ya cargada en memoria."""
+    for row_idx in range(ws.max_row, 1, -1):
+        valor = ws.cell(row=row_idx, column=1).value
+        if valor is not None:
+            return {"ultima_clave": a_clave(valor), "filas": row_idx - 1}
+    return {"ultima_clave": None, "filas": 0}
+
+
+def marcas_de_libro(wb) -> dict:
+    return {ws.title: marcas_de_hoja(ws) for ws in wb.worksheets}
+
+
+def leer_ultimas_filas(excel_path: Path, sheet_name: str, n: int, wb=None) -> tuple[list, list]:
+    """Devuelve (encabezado, últimas n filas con valor en la columna A) leyendo la hoja en modo read_only."""
+    propio = wb is None
+    if propio:
+        import openpyxl
+        wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            return [], []
+        ws = wb[sheet_name]
+        encabezado = list(next(ws.iter_rows(max_row=1, values_only=True), ()))
+        filas = deque(maxlen=n)
+        desde = max(2, (ws.max_row or 0) - n + 1)
+        for fila in ws.iter_rows(min_row=desde, values_only=True):
+            if fila and fila[0] is not None:
+                filas.append(fila)
+        if not filas and desde > 2:
+            # La dimensión declarada incluía filas vacías al final: se recorre la hoja entera
+            for fila in ws.iter_rows(min_row=2, values_only=True):
+                if fila and fila[0] is not None:
+                    filas.append(fila)
+        return encabezado, list(filas)
+    finally:
+        if propio:
+            wb.close()
+
+
+def leer_ultimas_claves(excel_path: Path, hojas: list[str]) -> dict:
+    """Última clave de cada hoja pedida: desde los metadatos si están al día, si no con un único read_only."""
+    meta = cargar(excel_path)
+    if meta is not None and all(hoja in meta for hoja in hojas):
+        return {hoja: meta[hoja]["ultima_clave"] for hoja in hojas}
+
+    # openpyxl se importa recién acá: la página consulta el índice sin cargarlo
+    import openpyxl
+    wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        claves = {}
+        for hoja in hojas:
+            _, filas = leer_ultimas_filas(excel_path, hoja, 1, wb=wb)
+            claves[hoja] = a_clave(filas[-1][0]) if filas else None
+        return claves
+    finally:
+        wb.close()
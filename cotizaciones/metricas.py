@@ -0,0 +1,248 @@
+"""Métricas de cada corrida del proceso de actualización.
+
+Durante una corrida (`with corrida():`) se registra la duración de cada etapa medida
+(descargas, combinación de hojas, estilos, relleno, carga y guardado del libro) y se
+acumulan contadores: bytes descargados, reintentos HTTP, aciertos de caché y filas
+escritas. Al terminar se agrega una línea JSON a `metricas.jsonl` (junto a config.json,
+con rotación) y, si config.json tiene "prometheus_textfile", se reescribe ese archivo
+en el formato de texto de Prometheus para el textfile collector de node_exporter.
+
+Fuera de una corrida, `etapa`, `medida` y `sumar` no hacen nada.
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from cotizaciones import config
+
+# pandas se importa donde se usa: la página lee las métricas sin cargarlo
+if TYPE_CHECKING:
+    import pandas as pd
+
+METRICAS_ARCHIVO = "metricas.jsonl"
+METRICAS_BYTES_MAXIMOS = 1024 * 1024
+METRICAS_RESPALDOS = 5
+
+_logger_metricas = logging.getLogger("cotizaciones.metricas")
+_logger_metricas.propagate = False
+
+
+class Corrida:
+    """Etapas y contadores de una corrida; se puede registrar desde varios hilos."""
+
+    def __init__(self):
+        self.inicio = datetime.now()
+        self._t0 = time.perf_counter()
+        self.segundos = None
+        self.exito = None
+        self.etapas = []
+        self.contadores = {}
+        self._lock = threading.Lock()
+
+    def registrar_etapa(self, nombre: str, etiquetas: dict, segundos: float, filas: int | None = None):
+        registro = {"etapa": nombre, **etiquetas, "segundos": round(segundos, 4)}
+        if filas is not None:
+            registro["filas"] = filas
+        with self._lock:
+            self.etapas.append(registro)
+
+    def sumar(self, nombre: str, valor: float, etiquetas: dict):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def terminar(self):
+        self.segundos = time.perf_counter() - self._t0
+
+    def como_dict(self) -> dict:
+        return {
+            "inicio": self.inicio.isoformat(timespec='seconds'),
+            "segundos": round(self.segundos or 0.0, 3),
+            "exito": self.exito,
+            "etapas": self.etapas,
+            "contadores": [
+                {"contador": nombre, **dict(etiquetas), "valor": valor}
+                for (nombre, etiquetas), valor in sorted(self.contadores.items())
+            ],
+        }
+
+
+_actual: Corrida | None = None
+
+
+@contextmanager
+def corrida():
+    """Mide todo lo que ocurra dentro del bloque y publica el resultado al salir."""
+    global _actual
+    actual = Corrida()
+    _actual = actual
+    try:
+        yield actual
+    finally:
+        _actual = None
+        actual.terminar()
+        _publicar(actual)
+
+@contextmanager
+def etapa(nombre: str, **etiquetas):
+    """Mide la duración del bloque. El dict que devuelve admite "filas" para informar filas procesadas."""
+    actual = _actual
+    registro = {}
+    if actual is None:
+        yield registro
+        return
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        actual.registrar_etapa(nombre, etiquetas, time.perf_counter() - inicio, registro.get("filas"))
+
+def medida(nombre: str | None = None, etiqueta: str | None = None):
+    """Decorador: mide cada llamada como una etapa. Si devuelve un DataFrame se informan sus filas.
+
+    `etiqueta` es el nombre de un argumento cuyo valor se guarda con la etapa (ej. la hoja).
+    """
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+        nombre_etapa = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if _actual is None:
+                return funcion(*args, **kwargs)
+            etiquetas = {}
+            if etiqueta is not None:
+                etiquetas[etiqueta] = firma.bind(*args, **kwargs).arguments.get(etiqueta)
+            with etapa(nombre_etapa, **etiquetas) as registro:
+                resultado = funcion(*args, **kwargs)
+                import pandas as pd
+                if isinstance(resultado, pd.DataFrame):
+                    registro["filas"] = len(resultado)
+                return resultado
+        return envoltura
+    return decorador
+
+def sumar(contador: str, valor: float = 1, **etiquetas):
+    actual = _actual
+    if actual is not None:
+        actual.sumar(contador, valor, etiquetas)
+
+
+# --- PUBLICACIÓN ---
+
+def ruta_log() -> Path:
+    return Path(config.CONFIG_FILE).with_name(METRICAS_ARCHIVO)
+
+def _handler_log() -> RotatingFileHandler:
+    # Se recrea si cambió la ubicación de config.json (ej. --config en la línea de comandos)
+    ruta = str(ruta_log().resolve())
+    for handler in _logger_metricas.handlers:
+        if handler.baseFilename == ruta:
+            return handler
+        _logger_metricas.removeHandler(handler)
+        handler.close()
+    handler = RotatingFileHandler(ruta, maxBytes=METRICAS_BYTES_MAXIMOS, backupCount=METRICAS_RESPALDOS, encoding='utf-8')
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger_metricas.addHandler(handler)
+    _logger_metricas.setLevel(logging.INFO)
+    return handler
+
+def _publicar(actual: Corrida):
+    datos = actual.como_dict()
+    try:
+        _handler_log()
+        _logger_metricas.info(json.dumps(datos, ensure_ascii=False))
+    except OSError:
+        pass
+    destino = config.cargar_config().get("prometheus_textfile")
+    if destino:
+        try:
+            exportar_prometheus(datos, Path(destino))
+        except OSError:
+            pass
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _etiquetas_prometheus(etiquetas: dict) -> str:
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas.items()) + "}"
+
+def exportar_prometheus(datos: dict, destino: Path):
+    """Escribe la última corrida como métricas de texto de Prometheus (reemplazo atómico)."""
+    lineas = [
+        "# HELP cotizaciones_corrida_segundos Duración de la última corrida.",
+        "# TYPE cotizaciones_corrida_segundos gauge",
+        f"cotizaciones_corrida_segundos {datos['segundos']}",
+        "# HELP cotizaciones_corrida_exito 1 si la última corrida terminó bien.",
+        "# TYPE cotizaciones_corrida_exito gauge",
+        f"cotizaciones_corrida_exito {1 if datos['exito'] else 0}",
+        "# HELP cotizaciones_corrida_timestamp_segundos Inicio de la última corrida (epoch).",
+        "# TYPE cotizaciones_corrida_timestamp_segundos gauge",
+        f"cotizaciones_corrida_timestamp_segundos {datetime.fromisoformat(datos['inicio']).timestamp():.0f}",
+        "# HELP cotizaciones_etapa_segundos Duración de cada etapa en la última corrida.",
+        "# TYPE cotizaciones_etapa_segundos gauge",
+    ]
+    por_etapa = {}
+    for registro in datos["etapas"]:
+        etiquetas = {k: v for k, v in registro.items() if k not in ("segundos", "filas")}
+        clave = _etiquetas_prometheus(etiquetas)
+        por_etapa[clave] = por_etapa.get(clave, 0.0) + registro["segundos"]
+    lineas += [f"cotizaciones_etapa_segundos{clave} {segundos:.4f}" for clave, segundos in por_etapa.items()]
+
+    por_contador = {}
+    for registro in datos["contadores"]:
+        etiquetas = {k: v for k, v in registro.items() if k not in ("contador", "valor")}
+        por_contador.setdefault(registro["contador"], []).append((etiquetas, registro["valor"]))
+    for contador, valores in por_contador.items():
+        lineas += [f"# TYPE cotizaciones_{contador} gauge"]
+        lineas += [f"cotizaciones_{contador}{_etiquetas_prometheus(e)} {v}" for e, v in valores]
+
+    tmp = destino.with_name(destino.name + ".tmp")
+    tmp.write_text("\n".join(lineas) + "\n", encoding='utf-8')
+    os.replace(tmp, destino)
+
+
+# --- LECTURA (panel de la página) ---
+
+def leer_corridas(n: int = 30) -> list[dict]:
+    """Últimas `n` corridas registradas (de la más vieja a la más nueva)."""
+    ruta = ruta_log()
+    if not ruta.exists():
+        return []
+    with open(ruta, 'r', encoding='utf-8') as f:
+        lineas = f.readlines()[-n:]
+    corridas = []
+    for linea in lineas:
+        try:
+            corridas.append(json.loads(linea))
+        except ValueError:
+            continue
+    return corridas
+
+def resumen_etapas(datos: dict) -> "pd.DataFrame":
+    """Segundos y filas por etapa (sumando las llamadas repetidas), de la más lenta a la más rápida."""
+    import pandas as pd
+
+    if not datos.get("etapas"):
+        return pd.DataFrame(columns=["etapa", "detalle", "segundos", "filas"])
+    df = pd.DataFrame(datos["etapas"])
+    etiquetas = [c for c in df.columns if c not in ("etapa", "segundos", "filas")]
+    df["detalle"] = df[etiquetas].astype("string").fillna("").agg(" ".join, axis=1).str.strip() if etiquetas else ""
+    if "filas" not in df.columns:
+        df["filas"] = pd.NA
+    resumen = df.groupby(["etapa", "detalle"], as_index=False).agg(segundos=("segundos", "sum"), filas=("filas", lambda filas: filas.sum(min_count=1)))
+    return resumen.sort_values("segundos", ascending=False).reset_index(drop=True)
+
+def total_contador(datos: dict, contador: str) -> float:
+    return sum(r["valor"] for r in datos.get("contadores", []) if r["contador"] == contador)
@@ -0,0 +1,385 @@
+"""Proceso completo de actualización: planificar, descargar en paralelo y volcar al Excel."""
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from datetime import date, datetime, timedelta
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from cotizaciones import catalogo, config, metricas
+from cotizaciones.almacen import Almacen
+from cotizaciones.cache_http import CacheHTTP
+from cotizaciones.catalogo import FUENTES, FUENTE_POR_NOMBRE, HOJA_POR_FUENTE, TIMEOUT_POR_DEFECTO, Fuente, Planificacion
+from cotizaciones.coordinacion import BloqueoArchivo, ruta_bloqueo, una_sola_vez
+from cotizaciones.fuentes import obtener_cotizaciones, obtener_mep, obtener_libre, obtener_datos_rosario
+from cotizaciones.hojas import ROSARIO_SHEET, HOJAS_CON_RELLENO, ROSARIO_SOLAPAMIENTO_DIAS, CLAVE_POR_HOJA
+from cotizaciones.indicadores import actualizar_indicadores
+from cotizaciones.libro import (
+    SesionLibro, is_file_locked, asegurar_hojas_existen,
+    actualizar_hoja_excel, guardar_rosario_con_estilo, post_process_and_fill_sheet,
+    exportar_hojas_atrasadas, exportar_hoja, exportar_libro_completo,
+)
+from cotizaciones.reporte import reporte
+
+# Tiempo máximo (segundos) para toda la etapa de descarga; el de cada fuente está en su entrada del catálogo
+PLAZO_GLOBAL_DESCARGA = 180
+
+# Espera máxima (segundos) a que termine otra corrida que está escribiendo el mismo Excel
+ESPERA_BLOQUEO = 900
+
+
+# --- DESCARGA CONCURRENTE ---
+
+def descargar_fuentes(tareas: dict, plazo_global: float = PLAZO_GLOBAL_DESCARGA) -> dict[str, pd.DataFrame]:
+    """Ejecuta todas las descargas en paralelo y devuelve un DataFrame por fuente.
+
+    Cada fuente tiene su propio tiempo límite (Fuente.timeout) acotado por el plazo global.
+    Si una fuente falla o vence su plazo no figura en el resultado y se omite su hoja.
+    """
+    if not tareas:
+        return {}
+
+    def con_progreso(nombre: str, tarea):
+        def ejecutar():
+            reporte.progreso(nombre, "descargando")
+            return tarea()
+        return ejecutar
+
+    for nombre in tareas:
+        reporte.progreso(nombre, "en espera")
+    inicio = time.monotonic()
+    resultados = {}
+    executor = ThreadPoolExecutor(max_workers=len(tareas), thread_name_prefix="descarga", initializer=reporte.inicializador_hilo())
+    try:
+        futuros = {nombre: executor.submit(con_progreso(nombre, tarea)) for nombre, tarea in tareas.items()}
+        for nombre, futuro in futuros.items():
+            fuente = FUENTE_POR_NOMBRE.get(nombre)
+            limite = inicio + min(fuente.timeout if fuente else TIMEOUT_POR_DEFECTO, plazo_global)
+            try:
+                resultados[nombre] = futuro.result(timeout=max(0.0, limite - time.monotonic()))
+                reporte.progreso(nombre, "sin datos" if resultados[nombre].empty else "ok")
+            except FuturesTimeout:
+                reporte.progreso(nombre, "tiempo agotado")
+                reporte.warning(f"⏱️ {nombre}: se agotó el tiempo de espera, se omite en esta ejecución.")
+            except Exception as e:
+                reporte.progreso(nombre, "error")
+                reporte.error(f"❌ Error descargando {nombre}: {e}")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return resultados
+
+
+# --- COORDINACIÓN ENTRE CORRIDAS ---
+
+def _medida(funcion, *args) -> bool:
+    with metricas.corrida() as corrida:
+        corrida.exito = funcion(*args)
+    return corrida.exito
+
+def _coordinada(clave: tuple, funcion, reutiliza_completa: bool = False) -> bool:
+    """Ejecuta `funcion()` con el Excel bloqueado para otros procesos.
+
+    Un pedido igual a uno en curso en este proceso (misma `clave` y mismo Excel) espera y
+    comparte su resultado. Si el Excel lo tenía otro proceso y `reutiliza_completa`, al
+    liberarse no se repite la corrida cuando esa otra registró una actualización completa.
+    """
+    ruta_excel = config.excel_path()
+
+    def con_bloqueo() -> bool:
+        bloqueo = BloqueoArchivo(ruta_bloqueo(ruta_excel))
+        pedido = datetime.now()
+        if not bloqueo.adquirir():
+            reporte.info("⏳ Otra ejecución está actualizando el Excel; se espera a que termine...")
+            if not bloqueo.adquirir(ESPERA_BLOQUEO):
+                reporte.error("❌ La otra ejecución sigue en curso después de la espera máxima; se cancela esta.")
+                return False
+            if reutiliza_completa and config.ultima_actualizacion() >= pedido:
+                bloqueo.liberar()
+                reporte.success("✅ La otra ejecución ya completó la actualización.")
+                return True
+        try:
+            return funcion()
+        finally:
+            bloqueo.liberar()
+
+    def al_esperar():
+        reporte.info("⏳ Ya hay una actualización en curso; se usa su resultado.")
+
+    if not ruta_excel.exists():
+        return funcion()
+    return una_sola_vez((str(ruta_excel.resolve()), *clave), con_bloqueo, al_esperar)
+
+
+# --- PROCESO PRINCIPAL ---
+
+def _excel_disponible(ruta_excel: Path) -> bool:
+    if is_file_locked(ruta_excel):
+        reporte.error("❌ El archivo Excel se encuentra abierto o bloqueado por otro programa. Por favor, ciérralo y vuelve a intentarlo.")
+        return False
+    if not ruta_excel.exists():
+        reporte.error(f"❌ El archivo Excel no existe en: {ruta_excel}")
+        return False
+    return True
+
+def _planificar_descargas(ruta_excel: Path, hoy: date, fuentes: list[Fuente], cache: CacheHTTP | None = None) -> dict:
+    """Arma las descargas de `fuentes` según lo último guardado en cada hoja (sin cargar el libro).
+
+    Los índices que ya están en el almacén local se consultan a través de `cache` y se omiten
+    si no cambiaron. Las fuentes que no tienen nada que pedir no figuran en el resultado.
+    """
+    plan = Planificacion(ruta_excel, hoy, [fuente.hoja for fuente in fuentes], cache)
+    tareas = {fuente.nombre: fuente.descarga(plan) for fuente in fuentes}
+    return {nombre: tarea for nombre, tarea in tareas.items() if tarea is not None}
+
+def _volcar_en_libro(libro: SesionLibro, datos: dict, hoy: date, solo: set[str] | None = None):
+    """Aplica todas las actualizaciones sobre el libro abierto (se guarda una sola vez al final).
+
+    Devuelve False si alguna hoja no se pudo actualizar.
+    """
+    asegurar_hojas_existen(libro)
+    # Primero se ponen al día las hojas que no recibieron lo último del almacén en una corrida anterior
+    exportar_hojas_atrasadas(libro)
+    completo = True
+
+    for fuente in FUENTES:
+        df_fuente = datos.get(fuente.nombre)
+        if df_fuente is None or df_fuente.empty:
+            continue
+        faltantes = [col for col in fuente.columnas if col not in df_fuente.columns]
+        if faltantes:
+            reporte.error(f"❌ {fuente.nombre}: faltan las columnas {', '.join(faltantes)}; no se actualiza la hoja '{fuente.hoja}'.")
+            completo = False
+        elif fuente.hoja == ROSARIO_SHEET:
+            # PIZARRA ROSARIO
+            completo &= guardar_rosario_con_estilo(libro, df_fuente)
+        else:
+            completo &= actualizar_hoja_excel(libro, df_fuente, fuente.hoja, fuente.clave, fuente.formatos, hoy)
+
+    # POST-PROCESO
+    reporte.divider()
+    reporte.subheader("🛠️ Post-Proceso: Relleno de Fechas")
+    for hoja in HOJAS_CON_RELLENO:
+        if solo is None or hoja in solo:
+            post_process_and_fill_sheet(libro, hoja, CLAVE_POR_HOJA[hoja], hoy)
+
+    # Con las series ya combinadas y rellenadas, se recalculan los indicadores afectados
+    actualizar_indicadores(libro)
+    return completo
+
+def regenerar_excel_desde_almacen() -> bool:
+    """Regenera todas las hojas del Excel desde el almacén local, sin consultar ninguna API."""
+    return _coordinada(("regenerar",), _regenerar)
+
+def _regenerar() -> bool:
+    ruta_excel = config.excel_path()
+    if is_file_locked(ruta_excel) or not ruta_excel.exists():
+        reporte.error("❌ El archivo Excel no existe o se encuentra abierto por otro programa.")
+        return False
+    try:
+        # En una sola pasada si el libro no tiene nada más que las series; si no, hoja por hoja
+        if not exportar_libro_completo(ruta_excel):
+            with SesionLibro(ruta_excel) as libro:
+                asegurar_hojas_existen(libro)
+                for hoja in libro.almacen.series():
+                    if hoja in CLAVE_POR_HOJA:
+                        exportar_hoja(libro, hoja)
+                libro.modificado = True
+    except Exception as e:
+        reporte.error(f"❌ Error regenerando el Excel: {e}")
+        return False
+    reporte.success("✅ Excel regenerado desde los datos locales.")
+    return True
+
+def ejecutar_proceso_completo_de_actualizacion(solo: set[str] | None = None, solo_vencidas: bool = False) -> bool:
+    """Descarga lo nuevo de cada fuente y lo vuelca al Excel.
+
+    `solo` limita la corrida a esas hojas; en ese caso no se registra como actualización completa.
+    Con `solo_vencidas` se consultan únicamente las fuentes a las que ya les toca según su
+    cadencia (ver cotizaciones/catalogo.py), como en las actualizaciones automáticas.
+    Devuelve False si alguna descarga falló o alguna hoja no se pudo actualizar.
+    Los tiempos de cada etapa y los contadores de la corrida quedan en metricas.jsonl.
+    Si ya hay una corrida en curso sobre el mismo Excel, se espera a que termine (ver _coordinada).
+    """
+    clave = ("actualizar", None if solo is None else frozenset(solo), solo_vencidas)
+    reutiliza_completa = solo is None and not solo_vencidas
+    return _coordinada(clave, partial(_medida, _actualizar, solo, solo_vencidas), reutiliza_completa)
+
+def _actualizar(solo: set[str] | None, solo_vencidas: bool) -> bool:
+    reporte.divider()
+    reporte.info("Iniciando proceso de actualización de datos...")
+    
+    ruta_excel = config.excel_path()
+    
+    # 0. VERIFICAR QUE EL ARCHIVO NO ESTÉ BLOQUEADO/ABIERTO
+    if not _excel_disponible(ruta_excel):
+        return False
+
+    hoy = date.today()
+    fuentes = catalogo.seleccionar(solo)
+    if solo_vencidas:
+        # Se evalúa recién acá, con el Excel ya bloqueado: si otra corrida acaba de consultarlas, no se repiten
+        consultas = config.ultimas_consultas(FUENTE_POR_NOMBRE)
+        fuentes = catalogo.vencidas(fuentes, consultas, datetime.now())
+        if not fuentes:
+            reporte.success("✅ Ninguna fuente tiene datos nuevos esperables todavía.")
+            return True
+        reporte.info(f"📅 Fuentes a consultar según su cadencia: {', '.join(fuente.nombre for fuente in fuentes)}.")
+
+    # 1. DETERMINAR QUÉ PEDIR Y DESCARGAR LAS FUENTES EN PARALELO
+    cache = CacheHTTP(Almacen(ruta_excel).directorio / "cache_http")
+    with metricas.etapa("planificar"):
+        tareas = _planificar_descargas(ruta_excel, hoy, fuentes, cache)
+    reporte.info(f"🌐 Descargando {len(tareas)} fuentes en paralelo...")
+    with metricas.etapa("descargas"):
+        datos = descargar_fuentes(tareas)
+
+    # 2. ABRIR EL LIBRO UNA VEZ, VOLCAR TODO Y GUARDAR
+    try:
+        libro = SesionLibro(ruta_excel)
+    except Exception as e:
+        reporte.error(f"❌ Error al abrir el archivo Excel: {e}")
+        return False
+
+    try:
+        with libro:
+            completo = _volcar_en_libro(libro, datos, hoy, solo)
+    except Exception as e:
+        reporte.error(f"❌ Error al guardar el archivo Excel: {e}")
+        return False
+
+    # Las respuestas recién descargadas solo cuentan como procesadas si sus datos quedaron guardados.
+    # Las fuentes sin nada que pedir también cuentan como consultadas; las que fallaron quedan pendientes
+    if completo:
+        cache.confirmar(datos.keys())
+        config.registrar_consultas(f.nombre for f in fuentes if f.nombre in datos or f.nombre not in tareas)
+
+    fallidas = [nombre for nombre in tareas if nombre not in datos]
+    if fallidas or not completo:
+        motivo = f"fallaron {', '.join(fallidas)}" if fallidas else "alguna hoja no se pudo actualizar"
+        reporte.warning(f"⚠️ Actualización incompleta ({motivo}): se reintenta en la próxima ejecución.")
+        return False
+
+    # GUARDAR LA FECHA Y HORA DE ACTUALIZACIÓN EN EL DISCO
+    # Solo una corrida de todas las fuentes sin fallas cuenta como completa (ver _coordinada); las
+    # automáticas quedan registradas por fuente en las consultas
+    if solo is None and not solo_vencidas:
+        config.registrar_actualizacion()
+
+    reporte.success("✅ Proceso completo finalizado.")
+    return True
+
+
+# --- BACKFILL HISTÓRICO ---
+
+def _bna_tramo(desde: date, hasta: date) -> pd.DataFrame:
+    return obtener_cotizaciones(desde.strftime("%d/%m/%Y"), hasta.strftime("%d/%m/%Y"), estricto=True)
+
+def _rosario_tramo(desde: date, hasta: date) -> pd.DataFrame:
+    # Se pide con solapamiento para arrastrar valores hacia los primeros días sin dato del mes
+    df = obtener_datos_rosario(desde - timedelta(days=ROSARIO_SOLAPAMIENTO_DIAS), hasta, estricto=True)
+    return df[df["Fecha"] >= pd.Timestamp(desde)] if not df.empty else df
+
+# Fuentes que se consultan por rango de fechas: (desde, hasta) -> DataFrame, lanzando
+# DescargaFallida si falla. Las demás devuelven siempre la serie completa.
+TRAMO_POR_FUENTE = {
+    "BNA": _bna_tramo,
+    "MEP": partial(obtener_mep, estricto=True),
+    "LIBRE": partial(obtener_libre, estricto=True),
+    "ROSARIO": _rosario_tramo,
+}
+BACKFILL_HILOS = 4
+BACKFILL_CARPETA = "backfill"
+
+
+def tramos_mensuales(desde: date, hasta: date) -> list[tuple[date, date]]:
+    """Divide [desde, hasta] en meses calendario (el primero y el último pueden ser parciales)."""
+    if desde > hasta:
+        return []
+    inicios = [desde] + [d.date() for d in pd.date_range(desde, hasta, freq='MS') if d.date() > desde]
+    return [(inicio, min(hasta, (pd.Timestamp(inicio) + pd.offsets.MonthEnd(0)).date())) for inicio in inicios]
+
+def _nombre_tramo(fuente: str, desde: date, hasta: date) -> str:
+    return f"{fuente}_{desde.isoformat()}_{hasta.isoformat()}"
+
+def ejecutar_backfill(desde: date, solo: set[str] | None = None, hilos: int = BACKFILL_HILOS) -> bool:
+    """Descarga la historia desde `desde` por meses, con `hilos` consultas a la vez, y la vuelca al Excel.
+
+    Cada mes descargado se guarda en `<almacén>/backfill/` antes de seguir, así una corrida
+    interrumpida retoma desde los meses que faltan. Los tramos se borran recién cuando
+    toda la historia de la fuente quedó en el Excel.
+    """
+    clave = ("backfill", desde, None if solo is None else frozenset(solo))
+    return _coordinada(clave, partial(_medida, _backfill, desde, solo, hilos))
+
+def _backfill(desde: date, solo: set[str] | None, hilos: int) -> bool:
+    reporte.divider()
+    ruta_excel = config.excel_path()
+    if not _excel_disponible(ruta_excel):
+        return False
+
+    hoy = date.today()
+    hasta = hoy - timedelta(days=1)
+    fuentes = [f for f in TRAMO_POR_FUENTE if solo is None or HOJA_POR_FUENTE[f] in solo]
+    tramos = tramos_mensuales(desde, hasta)
+    guardados = Almacen(ruta_excel).subalmacen(BACKFILL_CARPETA)
+    pendientes = [
+        (fuente, inicio, fin) for fuente in fuentes for inicio, fin in tramos
+        if not guardados.existe(_nombre_tramo(fuente, inicio, fin))
+    ]
+    total = len(fuentes) * len(tramos)
+    reporte.info(
+        f"📦 Backfill desde {desde:%d/%m/%Y} ({', '.join(fuentes)}): {total} tramos mensuales, "
+        f"{total - len(pendientes)} ya descargados."
+    )
+
+    fallidas = set()
+    executor = ThreadPoolExecutor(max_workers=max(1, hilos), thread_name_prefix="backfill", initializer=reporte.inicializador_hilo())
+    try:
+        futuros = {executor.submit(TRAMO_POR_FUENTE[fuente], inicio, fin): (fuente, inicio, fin) for fuente, inicio, fin in pendientes}
+        with metricas.etapa("descargas"):
+            for hechos, futuro in enumerate(as_completed(futuros), start=1):
+                fuente, inicio, fin = futuros[futuro]
+                try:
+                    df = futuro.result()
+                except Exception as e:
+                    fallidas.add(fuente)
+                    reporte.warning(f"⚠️ {fuente} {inicio:%m/%Y}: {e} (se reintenta en la próxima ejecución).")
+                    continue
+                # Los meses sin datos también se guardan, para no volver a pedirlos
+                guardados.escribir(_nombre_tramo(fuente, inicio, fin), df)
+                reporte.info(f"📦 {fuente} {inicio:%m/%Y}: {len(df)} filas ({hechos}/{len(futuros)}).")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    # Se vuelca todo lo descargado (aunque falten meses) combinando con lo ya guardado
+    datos = {}
+    for fuente in fuentes:
+        partes = [guardados.leer(s) for s in guardados.series() if s.startswith(f"{fuente}_")]
+        partes = [df for df in partes if df is not None and not df.empty]
+        if partes:
+            clave = CLAVE_POR_HOJA[HOJA_POR_FUENTE[fuente]]
+            datos[fuente] = pd.concat(partes, ignore_index=True).sort_values(clave).reset_index(drop=True)
+
+    if datos:
+        try:
+            with SesionLibro(ruta_excel) as libro:
+                completo = _volcar_en_libro(libro, datos, hoy, {HOJA_POR_FUENTE[f] for f in datos})
+        except Exception as e:
+            reporte.error(f"❌ Error al guardar el archivo Excel: {e}")
+            return False
+        if not completo:
+            return False
+
+    for fuente in fuentes:
+        if fuente not in fallidas:
+            for serie in guardados.series():
+                if serie.startswith(f"{fuente}_"):
+                    guardados.borrar(serie)
+
+    if fallidas:
+        reporte.warning(f"⚠️ Backfill incompleto ({', '.join(sorted(fallidas))}): vuelve a ejecutarlo para completar los meses que faltan.")
+        return False
+    reporte.success("✅ Backfill completo.")
+    return True
@@ -0,0 +1,84 @@
+"""Reporte de progreso desacoplado de la interfaz.
+
+El proceso de actualización informa su avance a través de `reporte`, que delega en
+el reporte activo. La página de Streamlit instala uno que escribe con st.info/st.success/...
+y la línea de comandos uno que escribe en el log, así el proceso no depende de Streamlit.
+Un hilo puede instalar su propio reporte con `usar_en_hilo` (ej. una actualización en
+segundo plano que guarda su avance para que la página lo consulte).
+"""
+import logging
+import threading
+
+logger = logging.getLogger("cotizaciones")
+
+
+class Reporte:
+    """Reporte base: descarta los mensajes. Los métodos imitan los de Streamlit."""
+
+    def info(self, mensaje: str):
+        pass
+
+    def success(self, mensaje: str):
+        pass
+
+    def warning(self, mensaje: str):
+        pass
+
+    def error(self, mensaje: str):
+        pass
+
+    def subheader(self, mensaje: str):
+        pass
+
+    def divider(self):
+        pass
+
+    def progreso(self, fuente: str, estado: str):
+        """Estado de la descarga de una fuente ("descargando", "ok", "sin datos", "error", ...)."""
+        pass
+
+    def inicializador_hilo(self):
+        """Callable a ejecutar al iniciar cada hilo de descarga (o None)."""
+        return None
+
+
+class ReporteLog(Reporte):
+    """Escribe cada mensaje en el logger 'cotizaciones'."""
+
+    def info(self, mensaje: str):
+        logger.info(mensaje)
+
+    def success(self, mensaje: str):
+        logger.info(mensaje)
+
+    def warning(self, mensaje: str):
+        logger.warning(mensaje)
+
+    def error(self, mensaje: str):
+        logger.error(mensaje)
+
+    def subheader(self, mensaje: str):
+        logger.info(mensaje)
+
+
+class _ReporteActivo:
+    """Punto de acceso único: reenvía cada llamada al reporte del hilo (`usar_en_hilo`) o al instalado con `usar`."""
+
+    def __init__(self):
+        self.actual = Reporte()
+        self.hilo = threading.local()
+
+    def __getattr__(self, nombre):
+        return getattr(getattr(self.hilo, "actual", None) or self.actual, nombre)
+
+
+reporte = _ReporteActivo()
+
+
+def usar(nuevo: Reporte):
+    """Instala el reporte que recibirá los mensajes del proceso."""
+    reporte.actual = nuevo
+
+def usar_en_hilo(nuevo: Reporte | None):
+    """Instala un reporte solo para el hilo actual (None vuelve al instalado con `usar`)."""
+    reporte.hilo.actual = nuevo
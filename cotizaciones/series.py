@@ -0,0 +1,63 @@
+"""Transformaciones de series comunes a todas las hojas."""
+from collections.abc import Iterable
+from datetime import date
+
+import pandas as pd
+
+from cotizaciones.hojas import ESQUEMA_POR_HOJA
+
+
+def normalizar_formato_fecha(df: pd.DataFrame, col_name: str = 'Fecha', dayfirst: bool = True) -> pd.DataFrame:
+    """Parsea la columna de fecha (texto o fechas) a datetime64[ns] sin hora; lo no reconocido queda NaT."""
+    df = df.copy()
+    df[col_name] = pd.to_datetime(
+        df[col_name], 
+        dayfirst=dayfirst, 
+        errors='coerce'
+    ).dt.normalize().dt.as_unit('ns')
+    return df
+
+def a_datetime64(valores) -> pd.DatetimeIndex:
+    """Convierte fechas (date, datetime, texto ISO) a datetime64[ns], la resolución común de las series."""
+    return pd.DatetimeIndex(pd.to_datetime(valores)).as_unit('ns')
+
+def aplicar_esquema(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
+    """Lleva las columnas de la serie a los tipos de ESQUEMA_POR_HOJA (sin copiar las que ya los tienen).
+
+    Se aplica al entrar los datos (descargas, almacén local de versiones anteriores, hoja del
+    Excel), así las combinaciones, ordenamientos y rellenos trabajan sobre arrays nativos.
+    """
+    esquema = ESQUEMA_POR_HOJA.get(sheet_name, {})
+    cambios = {}
+    for col, tipo in esquema.items():
+        if col not in df.columns or df[col].dtype == tipo:
+            continue
+        valores = df[col]
+        if tipo == 'datetime64[ns]':
+            cambios[col] = a_datetime64(valores).normalize()
+        elif tipo == 'bool':
+            cambios[col] = valores.fillna(False).astype(bool)
+        elif tipo == 'str':
+            es_fecha = pd.api.types.is_datetime64_any_dtype(valores)
+            cambios[col] = valores.dt.strftime('%Y-%m-%d') if es_fecha else valores.astype(str)
+        else:
+            cambios[col] = pd.to_numeric(valores, errors='coerce').astype(tipo)
+    return df.assign(**cambios) if cambios else df
+
+def rellenar_fechas_faltantes(df: pd.DataFrame, key_column: str, exclude_dates: Iterable[date] = (), freq: str = 'D') -> pd.DataFrame:
+    """Completa las fechas faltantes entre la primera y la última arrastrando el último valor.
+
+    Las fechas de `exclude_dates` que no estaban en la serie no se agregan (ej. hoy y ayer,
+    que todavía pueden publicarse). Sirve para cualquier hoja con clave de fecha; la clave
+    del resultado queda en datetime64[ns] y los valores conservan su tipo numérico.
+    """
+    if df.empty: return pd.DataFrame()
+    indice = a_datetime64(df[key_column]).rename(key_column)
+    serie = df.drop(columns=key_column).set_axis(indice).sort_index()
+
+    fechas = pd.date_range(start=indice.min(), end=indice.max(), freq=freq, name=key_column).as_unit('ns')
+    excluidas = a_datetime64(list(exclude_dates)).difference(indice)
+    if len(excluidas):
+        fechas = fechas[~fechas.isin(excluidas)]
+
+    return serie.reindex(fechas).ffill().reset_index()
@@ -0,0 +1,107 @@
+"""Trabajos en segundo plano para la página.
+
+La actualización corre en un hilo propio y guarda su avance (mensajes y estado de cada
+fuente) en un `Trabajo`, que la página consulta en cada refresco sin bloquearse. El
+registro es global al proceso de Streamlit: si otra sesión pide el mismo trabajo mientras
+está en curso, recibe el que ya está corriendo en lugar de iniciar otro.
+"""
+import threading
+from datetime import datetime
+
+from cotizaciones.reporte import Reporte, logger, usar_en_hilo
+
+# Mensajes que se conservan por trabajo
+MAX_MENSAJES = 500
+
+
+class ReporteTrabajo(Reporte):
+    """Guarda los mensajes y el estado de cada fuente para mostrarlos después."""
+
+    def __init__(self):
+        self.mensajes = []
+        self.fuentes = {}
+        self._lock = threading.Lock()
+
+    def _agregar(self, nivel: str, mensaje: str):
+        with self._lock:
+            self.mensajes.append((nivel, mensaje))
+            del self.mensajes[:-MAX_MENSAJES]
+
+    def info(self, mensaje: str):
+        self._agregar("info", mensaje)
+
+    def success(self, mensaje: str):
+        self._agregar("success", mensaje)
+
+    def warning(self, mensaje: str):
+        self._agregar("warning", mensaje)
+
+    def error(self, mensaje: str):
+        self._agregar("error", mensaje)
+
+    def subheader(self, mensaje: str):
+        self._agregar("subheader", mensaje)
+
+    def progreso(self, fuente: str, estado: str):
+        with self._lock:
+            self.fuentes[fuente] = estado
+
+    def inicializador_hilo(self):
+        # Los hilos de descarga escriben en el mismo trabajo
+        return lambda: usar_en_hilo(self)
+
+    def copia(self) -> tuple[list, dict]:
+        with self._lock:
+            return list(self.mensajes), dict(self.fuentes)
+
+
+class Trabajo:
+    """Una ejecución en segundo plano: `resultado` es None mientras está en curso."""
+
+    def __init__(self, tipo: str):
+        self.tipo = tipo
+        self.reporte = ReporteTrabajo()
+        self.inicio = datetime.now()
+        self.fin = None
+        self.resultado = None
+        self._hecho = threading.Event()
+
+    @property
+    def en_curso(self) -> bool:
+        return not self._hecho.is_set()
+
+    def esperar(self, timeout: float | None = None) -> bool:
+        return self._hecho.wait(timeout)
+
+    def _correr(self, funcion, args):
+        usar_en_hilo(self.reporte)
+        try:
+            self.resultado = bool(funcion(*args))
+        except Exception as e:
+            logger.exception("El trabajo '%s' terminó con un error inesperado.", self.tipo)
+            self.reporte.error(f"❌ Error inesperado: {e}")
+            self.resultado = False
+        finally:
+            self.fin = datetime.now()
+            usar_en_hilo(None)
+            self._hecho.set()
+
+
+_trabajos: dict[str, Trabajo] = {}
+_lock = threading.Lock()
+
+
+def iniciar(tipo: str, funcion, *args) -> Trabajo:
+    """Corre `funcion(*args)` en un hilo; si ya hay un trabajo de ese tipo en curso, devuelve ese."""
+    with _lock:
+        actual = _trabajos.get(tipo)
+        if actual is not None and actual.en_curso:
+            return actual
+        trabajo = _trabajos[tipo] = Trabajo(tipo)
+    threading.Thread(target=trabajo._correr, args=(funcion, args), name=f"trabajo-{tipo}", daemon=True).start()
+    return trabajo
+
+def ultimo(tipo: str) -> Trabajo | None:
+    """El trabajo de ese tipo en curso o, si no hay, el último que terminó."""
+    with _lock:
+        return _trabajos.get(tipo)
@@ -0,0 +1,43 @@
+"""Los dos lectores de cotizaciones/lectores.py devuelven lo mismo para el mismo libro."""
+from datetime import date, datetime
+
+import openpyxl
+import pytest
+
+from cotizaciones import lectores
+
+FILAS = [
+    ("Fecha", "Valor", "Nota", "Marca"),
+    (date(2024, 1, 2), 1.5, None, True),
+    (datetime(2024, 1, 3, 12, 30), None, "x", False),
+    (None, 7.0, None, None),
+]
+ESPERADAS = [
+    ("Fecha", "Valor", "Nota", "Marca"),
+    (datetime(2024, 1, 2), 1.5, None, True),
+    (datetime(2024, 1, 3, 12, 30), None, "x", False),
+    (None, 7.0, None, None),
+]
+
+
+@pytest.fixture
+def libro(tmp_path):
+    path = tmp_path / "libro.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Serie"
+    for fila in FILAS:
+        ws.append(fila)
+    wb.save(path)
+    return path
+
+
+@pytest.mark.parametrize("motor", sorted(lectores.MOTORES))
+def test_lee_las_hojas_pedidas_igual_que_openpyxl(libro, motor):
+    if motor == "calamine":
+        pytest.importorskip("python_calamine")
+    filas = lectores.leer_hojas(libro, ["Serie", "Inexistente"], motor)
+    assert list(filas) == ["Serie"]
+    assert filas["Serie"] == ESPERADAS
+    assert all(isinstance(fila[0], datetime) for fila in filas["Serie"][1:3])
+    assert filas["Serie"][3][0] is None and filas["Serie"][1][2] is None
@@ -0,0 +1,69 @@
+"""Volcado de series al libro: lo nuevo va a la hoja sin reescribir la historia."""
+from datetime import date, datetime, timedelta
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from cotizaciones.hojas import MEP_SHEET, MEP_COLUMNS, FORMATOS_POR_HOJA
+from cotizaciones import libro as modulo_libro
+from cotizaciones.libro import SesionLibro, actualizar_hoja_excel, exportar_hojas_atrasadas, post_process_and_fill_sheet
+
+# De lunes 1 a jueves 4 de enero de 2024
+GUARDADAS = [(datetime(2024, 1, dia), 1000.0 + dia) for dia in range(1, 5)]
+
+
+@pytest.fixture
+def libro(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "libro.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = MEP_SHEET
+    ws.append(MEP_COLUMNS)
+    for fila in GUARDADAS:
+        ws.append(fila)
+    wb.save(path)
+    return path
+
+
+def test_fin_de_semana_rellenado_se_agrega_al_final(libro, monkeypatch):
+    modos = []
+    fusionar = SesionLibro.fusionar_hoja
+    def fusionar_registrando(self, sheet_name, *args, **kwargs):
+        modos.append(fusionar(self, sheet_name, *args, **kwargs))
+        return modos[-1]
+    monkeypatch.setattr(SesionLibro, "fusionar_hoja", fusionar_registrando)
+
+    # Viernes 5 y lunes 8; la corrida es el martes 9
+    descargado = pd.DataFrame({"fecha": pd.to_datetime(["2024-01-05", "2024-01-08"]), "DOLAR MEP": [1005.0, 1008.0]})
+    hoy = date(2024, 1, 9)
+    with SesionLibro(libro) as sesion:
+        assert actualizar_hoja_excel(sesion, descargado, MEP_SHEET, "fecha", FORMATOS_POR_HOJA[MEP_SHEET], hoy)
+        assert post_process_and_fill_sheet(sesion, MEP_SHEET, "fecha", hoy)
+
+    assert modos == ["anexar"]
+    filas = list(openpyxl.load_workbook(libro)[MEP_SHEET].iter_rows(min_row=2, values_only=True))
+    assert [fila[0] for fila in filas] == [datetime(2024, 1, 1) + timedelta(days=i) for i in range(8)]
+    # Sábado y domingo toman el valor del viernes
+    assert [fila[1] for fila in filas[4:]] == [1005.0, 1005.0, 1005.0, 1008.0]
+
+
+def test_revision_sin_guardar_se_exporta_en_la_corrida_siguiente(libro, monkeypatch):
+    viernes = pd.DataFrame({"fecha": pd.to_datetime(["2024-01-05"]), "DOLAR MEP": [1005.0]})
+    with SesionLibro(libro) as sesion:
+        actualizar_hoja_excel(sesion, viernes, MEP_SHEET, "fecha", FORMATOS_POR_HOJA[MEP_SHEET])
+
+    # Se revisa el jueves (sin fecha nueva) y el Excel no se puede guardar
+    def guardar_fallido(wb, path):
+        raise PermissionError("archivo bloqueado")
+    revision = pd.DataFrame({"fecha": pd.to_datetime(["2024-01-04"]), "DOLAR MEP": [999.0]})
+    with monkeypatch.context() as parche, pytest.raises(PermissionError):
+        parche.setattr(modulo_libro, "_guardar_atomico", guardar_fallido)
+        with SesionLibro(libro) as sesion:
+            actualizar_hoja_excel(sesion, revision, MEP_SHEET, "fecha", FORMATOS_POR_HOJA[MEP_SHEET])
+
+    with SesionLibro(libro) as sesion:
+        exportar_hojas_atrasadas(sesion)
+    ws = openpyxl.load_workbook(libro)[MEP_SHEET]
+    assert [(fila[0].day, fila[1]) for fila in ws.iter_rows(min_row=5, values_only=True)] == [(4, 999.0), (5, 1005.0)]